@@ -1,10 +1,26 @@
 from flask import Flask, render_template, redirect, request
 from config import config, Config
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
+from app.mod_repo import db_client, cache
+from app.mod_tm import docker_client, warm_pool, input_loader
 
 celery = Celery(__name__, broker=Config.CELERY_BROKER_URL)
 
 
+@worker_process_init.connect
+def reset_db_client(**kwargs):
+    # prefork children must not reuse the connection pools of the parent process
+    db_client.reset()
+    docker_client.reset()
+    input_loader.reset()
+
+
+@worker_process_shutdown.connect
+def drain_warm_pool(**kwargs):
+    warm_pool.drain()
+
+
 def create_app(config_name):
     app = Flask(__name__)
     app.url_map.strict_slashes = False
@@ -12,6 +28,44 @@ def create_app(config_name):
     # config[config_name].init_app(app)
 
     celery.conf.update(app.config)
+    db_client.init_app(app)
+    cache.init_app(app)
+    docker_client.init_app(app)
+
+    if app.config["DB_ENSURE_INDEXES"]:
+        from app.mod_repo import db_handler
+        try:
+            created, failed = db_handler.ensure_indexes()
+            for name, error in failed.items():
+                print("index", name, "could not be created:", error)
+        except Exception as e:
+            # the app can still serve requests, lookups just fall back to collection scans
+            print("index provisioning error", e)
+
+    try:
+        from app.mod_repo import blob_store, file_handler
+        blob_store.migrate_manifests(file_handler.get_pub_app_directory_path())
+    except Exception as e:
+        # blobs are not collected until every app folder has its manifest
+        print("manifest migration error", e)
+
+    @app.cli.command('db-indexes')
+    def db_indexes():
+        """Report index usage and query plans of the repository queries"""
+        import json
+        from app.mod_repo import db_handler
+        print(json.dumps({
+            "indexes": db_handler.get_index_stats(),
+            "queryPlans": db_handler.explain_queries()
+        }, indent=2))
+
+    @app.cli.command('migrate-signatures')
+    def migrate_signatures():
+        """Rewrite signatures, digests and signature index of all stored transformations
+        and add the content hashes missing from documents stored by older versions"""
+        from app.mod_repo import db_handler
+        print("updated", db_handler.migrate_signatures(), "transformations")
+        print("added", db_handler.backfill_content_hashes(), "content hashes")
 
     @app.before_request
     def clear_trailing():
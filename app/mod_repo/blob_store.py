@@ -0,0 +1,364 @@
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import stat
+import tarfile
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from config import BASE_DIR
+from app.mod_repo import file_transfer
+
+# Content-addressed storage of application files. Every file is kept once under
+# data/repo/blobs/<sha256[:2]>/<sha256>, a published app version is a manifest
+# of relative paths and hashes (or symlink targets) kept outside of the app's
+# tree under data/repo/manifests/<appID>.json, and its folder under
+# data/repo/applications is a tree of hardlinks to the blobs. A blob no manifest
+# refers to is removed by collect_garbage(). Blobs are put and linked while
+# holding storing(), so the collection never runs between a blob being put and
+# its manifest being written.
+
+MANIFEST_NAME = "manifest.json"
+READ_BUFFER_SIZE = 1024 ** 2
+
+
+def get_blobs_directory_path():
+    blobs_dir = os.path.join(BASE_DIR, "data", "repo", "blobs")
+    os.makedirs(blobs_dir, exist_ok=True)
+
+    return blobs_dir
+
+
+def get_blob_path(digest):
+    return os.path.join(get_blobs_directory_path(), digest[:2], digest)
+
+
+def get_manifests_directory_path():
+    manifests_dir = os.path.join(BASE_DIR, "data", "repo", "manifests")
+    os.makedirs(manifests_dir, exist_ok=True)
+
+    return manifests_dir
+
+
+def get_manifest_path(app_path):
+    # named after the app's folder, which is named after the app's ID
+    return os.path.join(get_manifests_directory_path(), os.path.basename(os.path.normpath(app_path)) + ".json")
+
+
+def get_uploads_directory_path():
+    # blobs received from elsewhere are written here first, outside of the shards
+    uploads_dir = os.path.join(BASE_DIR, "data", "repo", "blob-uploads")
+    os.makedirs(uploads_dir, exist_ok=True)
+
+    return uploads_dir
+
+
+@contextmanager
+def _locked(operation):
+    lock_path = os.path.join(os.path.dirname(get_blobs_directory_path()), "blobs.lock")
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def storing():
+    # shared between all stores of all processes, exclusive for collect_garbage()
+    return _locked(fcntl.LOCK_SH)
+
+
+def hash_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_BUFFER_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def put_file(path):
+    # moves the file into the store unless an identical blob already exists,
+    # linking instead of renaming never replaces a blob another worker created
+    digest = hash_file(path)
+    blob_path = get_blob_path(digest)
+    mode = stat.S_IMODE(os.stat(path).st_mode)
+    size = os.path.getsize(path)
+
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+    try:
+        os.link(path, blob_path)
+        method = "moved"
+    except FileExistsError:
+        method = "deduplicated"
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+            raise
+        if os.path.exists(blob_path):
+            method = "deduplicated"
+        else:
+            file_transfer.copy_file(path, blob_path)
+            method = "copied"
+    os.remove(path)
+
+    if method != "deduplicated":
+        # blobs are shared between apps and must never be modified in place
+        os.chmod(blob_path, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH) | stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+    return digest, size, mode, method
+
+
+def link_blob(digest, destination):
+    # a copy would silently turn into a second, unmanaged version of the file,
+    # app folders have to be on the file system of the blob store
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    try:
+        os.link(get_blob_path(digest), destination)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+            raise
+        raise OSError(e.errno, "blob %s cannot be linked to %s: %s" % (digest, destination, e.strerror))
+
+
+def list_symlinks(source_path):
+    # links to folders are not followed by os.walk() and listed among the folders
+    for root, dirs, names in os.walk(source_path):
+        for name in dirs + names:
+            if os.path.islink(os.path.join(root, name)):
+                yield os.path.relpath(os.path.join(root, name), source_path)
+
+
+def link_symlink(target, destination_path, rel_path):
+    # the target has to stay inside of the app's folder, as checked on extraction
+    destination = os.path.join(destination_path, rel_path)
+    resolved = os.path.normpath(os.path.join(os.path.dirname(destination), target))
+    if os.path.isabs(target) or not resolved.startswith(os.path.join(destination_path, "")):
+        raise ValueError("symlink " + rel_path + " points outside of the app folder")
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    os.symlink(target, destination)
+
+
+def store_tree(source_path, destination_path, workers=None):
+    # moves all files of source_path (including dotfiles) into the store and
+    # recreates the tree in destination_path, files are hashed in parallel
+    stats = file_transfer.TransferStats()
+    symlinks = set(list_symlinks(source_path))
+    rel_paths = [p for p in file_transfer.list_tree(source_path) if p not in symlinks]
+
+    def store(rel_path):
+        digest, size, mode, method = put_file(os.path.join(source_path, rel_path))
+        link_blob(digest, os.path.join(destination_path, rel_path))
+        stats.add(size, method)
+        return rel_path.replace(os.sep, "/"), {"sha256": digest, "size": size, "mode": mode}
+
+    files = dict(file_transfer.map_files(store, rel_paths, workers))
+    for rel_path in sorted(symlinks):
+        target = os.readlink(os.path.join(source_path, rel_path))
+        link_symlink(target, destination_path, rel_path)
+        files[rel_path.replace(os.sep, "/")] = {"symlink": target}
+
+    manifest = {"files": files, "createdAt": int(time.time())}
+    write_manifest(manifest, destination_path)
+
+    return manifest, stats.finish()
+
+
+def write_manifest(manifest, app_path):
+    # replaced atomically, readers never see a partially written manifest
+    manifest_path = get_manifest_path(app_path)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(manifest_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, sort_keys=True)
+        os.replace(temp_path, manifest_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def load_manifest(app_path):
+    with open(get_manifest_path(app_path)) as f:
+        return json.load(f)
+
+
+def remove_manifest(app_path):
+    try:
+        os.remove(get_manifest_path(app_path))
+    except FileNotFoundError:
+        pass
+
+
+def migrate_manifests(apps_path):
+    # older versions wrote the manifest into the app's folder, where it could
+    # clash with a manifest.json of the package itself
+    moved = 0
+    with storing():
+        for name in os.listdir(apps_path):
+            app_path = os.path.join(apps_path, name)
+            legacy_path = os.path.join(app_path, MANIFEST_NAME)
+            if os.path.exists(get_manifest_path(app_path)) or os.path.islink(legacy_path) \
+                    or not os.path.isfile(legacy_path):
+                continue
+            with open(legacy_path) as f:
+                manifest = json.load(f)
+            write_manifest(manifest, app_path)
+            if MANIFEST_NAME not in manifest["files"]:
+                try:
+                    os.remove(legacy_path)
+                except FileNotFoundError:
+                    pass
+            moved += 1
+
+    return moved
+
+
+def stream_package(app_path, chunk_size=READ_BUFFER_SIZE):
+    # generates the provisioning package (tar.gz of the app's files) on demand
+    # straight from the blobs, without building the archive on disk
+    manifest = load_manifest(app_path)
+    entries = []
+    for rel_path in sorted(manifest["files"]):
+        entry = manifest["files"][rel_path]
+        if "symlink" in entry:
+            entries.append((rel_path, 0, 0o777, manifest["createdAt"], [], entry["symlink"]))
+        else:
+            entries.append((rel_path, entry["size"], entry["mode"], manifest["createdAt"],
+                            read_blob(entry["sha256"], chunk_size), None))
+
+    return stream_tar_gz(entries)
+
+
+def read_blob(digest, chunk_size=READ_BUFFER_SIZE):
+    # lazily opened, a streamed archive never holds more than one blob open
+    with open(get_blob_path(digest), 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            yield chunk
+
+
+def stream_tar_gz(entries):
+    # entries are (name, size, mode, mtime, chunks, linkname), chunks must yield
+    # exactly size bytes, an entry with a linkname is a symlink without content
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    for name, size, mode, mtime, chunks, linkname in entries:
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mode = mode
+        info.mtime = mtime
+        if linkname is not None:
+            info.type = tarfile.SYMTYPE
+            info.linkname = linkname
+        data = compressor.compress(info.tobuf(format=tarfile.GNU_FORMAT))
+        if data:
+            yield data
+
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+
+        padding = (tarfile.BLOCKSIZE - size % tarfile.BLOCKSIZE) % tarfile.BLOCKSIZE
+        data = compressor.compress(b"\0" * padding)
+        if data:
+            yield data
+
+    yield compressor.compress(b"\0" * (2 * tarfile.BLOCKSIZE)) + compressor.flush()
+
+
+def stage_stream(stream, digest, staging_path, chunk_size=READ_BUFFER_SIZE):
+    # keeps a blob received from elsewhere in staging_path until publish_staged(),
+    # a blob the store has already is linked there, so it outlives a collection
+    staged_path = os.path.join(staging_path, digest)
+    if os.path.exists(staged_path) or _link_stored(digest, staged_path):
+        for _ in iter(lambda: stream.read(chunk_size), b""):
+            pass
+        return False
+
+    sha256 = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=staging_path, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                sha256.update(chunk)
+                f.write(chunk)
+        if sha256.hexdigest() != digest:
+            raise ValueError("content of blob %s does not match its digest" % digest)
+        os.chmod(temp_path, 0o444)
+        os.replace(temp_path, staged_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return True
+
+
+def _link_stored(digest, path):
+    try:
+        os.link(get_blob_path(digest), path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def publish_staged(manifest, staging_path):
+    # links the staged blobs of a manifest into the store, call with storing() held
+    for entry in manifest["files"].values():
+        if "sha256" not in entry:
+            continue
+        blob_path = get_blob_path(entry["sha256"])
+        if os.path.exists(blob_path):
+            continue
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        try:
+            os.link(os.path.join(staging_path, entry["sha256"]), blob_path)
+        except FileExistsError:
+            pass
+
+
+def link_manifest(manifest, destination_path):
+    # recreates an app's folder from blobs that are already in the store
+    for rel_path, entry in manifest["files"].items():
+        target = os.path.normpath(os.path.join(destination_path, rel_path))
+        if not target.startswith(os.path.join(destination_path, "")):
+            raise ValueError("invalid path in manifest: " + rel_path)
+        if "symlink" in entry:
+            link_symlink(entry["symlink"], destination_path, os.path.relpath(target, destination_path))
+        else:
+            link_blob(entry["sha256"], target)
+    write_manifest(manifest, destination_path)
+
+
+def find_referenced_blobs():
+    digests = set()
+    manifests_dir = get_manifests_directory_path()
+    for name in os.listdir(manifests_dir):
+        if name.endswith(".json"):
+            # an unreadable manifest ends the collection instead of losing its blobs
+            with open(os.path.join(manifests_dir, name)) as f:
+                digests.update(entry["sha256"] for entry in json.load(f)["files"].values() if "sha256" in entry)
+
+    return digests
+
+
+def collect_garbage(apps_path):
+    # removes every blob that no manifest refers to
+    removed = 0
+    blobs_dir = get_blobs_directory_path()
+    with _locked(fcntl.LOCK_EX):
+        unlisted = [name for name in os.listdir(apps_path)
+                    if not os.path.exists(get_manifest_path(os.path.join(apps_path, name)))]
+        if unlisted:
+            # not migrated yet or left over by a failed store, their blobs may still be in use
+            print("blobs not collected, app folders without manifest:", ", ".join(sorted(unlisted)))
+            return 0
+        referenced = find_referenced_blobs()
+        for root, dirs, names in os.walk(blobs_dir):
+            for name in names:
+                if name not in referenced:
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+
+    return removed
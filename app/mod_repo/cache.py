@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# Read-through cache for published documents. The first tier is an in-process
+# LRU bounded by size and TTL, the second tier is Redis (by default the Celery
+# broker), shared by the API and all workers. Documents are kept as JSON
+# strings, so every hit returns a fresh copy that callers are free to modify.
+#
+# Every key has a version in Redis that invalidate() increments. Entries of both
+# tiers record the version they were loaded at and a lookup reads the current
+# version together with the shared entry in one round trip, so a write in any
+# process is seen by all others at once. A document loaded while it is being
+# rewritten is stored under the version read before loading and is not served
+# after the invalidation.
+
+
+class LRUCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class RedisCache:
+    def __init__(self, url, ttl, prefix):
+        import redis
+        self.client = redis.StrictRedis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def fetch(self, key):
+        # (current version, (version, value) of the shared entry or None)
+        version, entry = self.client.mget(self.prefix + "version:" + key, self.prefix + key)
+        version = int(version) if version is not None else 0
+        if entry is not None:
+            entry_version, value = entry.decode("utf-8").split(":", 1)
+            entry = (int(entry_version), value)
+        return version, entry
+
+    def store(self, key, version, value):
+        self.client.setex(self.prefix + key, self.ttl, str(version) + ":" + value)
+
+    def invalidate(self, keys):
+        pipeline = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.incr(self.prefix + "version:" + key)
+        pipeline.delete(*[self.prefix + k for k in keys])
+        pipeline.execute()
+
+
+_local = None
+_remote = None
+_stats = {"local_hits": 0, "remote_hits": 0, "misses": 0, "invalidations": 0}
+_stats_lock = threading.Lock()
+
+
+def init_app(app):
+    global _local, _remote
+    if not app.config["CACHE_ENABLED"] or not app.config["CACHE_REDIS_URL"]:
+        # without the shared versions the processes could not invalidate each other's entries
+        _local = None
+        _remote = None
+        return
+
+    _local = LRUCache(app.config["CACHE_MAX_ENTRIES"], app.config["CACHE_TTL"])
+    _remote = RedisCache(app.config["CACHE_REDIS_URL"], app.config["CACHE_REDIS_TTL"],
+                         app.config["CACHE_REDIS_PREFIX"])
+
+
+def _count(counter):
+    with _stats_lock:
+        _stats[counter] += 1
+
+
+def get_or_load(key, loader):
+    if _local is None:
+        return loader()
+
+    try:
+        version, entry = _remote.fetch(key)
+    except Exception as e:
+        # an unavailable Redis must not break lookups, nor may it serve entries
+        # whose invalidation could have been missed
+        print("cache error", e)
+        return loader()
+
+    local = _local.get(key)
+    if local is not None and local[0] == version:
+        _count("local_hits")
+        return json.loads(local[1])
+
+    if entry is not None and entry[0] == version:
+        _count("remote_hits")
+        _local.set(key, entry)
+        return json.loads(entry[1])
+
+    _count("misses")
+    doc = loader()
+    if doc is not None:
+        value = json.dumps(doc)
+        _local.set(key, (version, value))
+        try:
+            _remote.store(key, version, value)
+        except Exception as e:
+            print("cache error", e)
+
+    return doc
+
+
+def invalidate(keys):
+    if _local is None or len(keys) == 0:
+        return
+
+    _local.delete(keys)
+    try:
+        _remote.invalidate(keys)
+    except Exception as e:
+        # entries of other processes are then only dropped by their TTL
+        print("cache error", e)
+    with _stats_lock:
+        _stats["invalidations"] += len(keys)
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["enabled"] = _local is not None
+    stats["redis"] = _remote is not None
+    stats["local_entries"] = len(_local) if _local is not None else 0
+
+    return stats
+
+
+def app_key(app_id):
+    return "app:" + app_id
+
+
+def transformation_id_key(t_id):
+    return "transformation:id:" + t_id
+
+
+def transformation_qname_key(qname):
+    return "transformation:qname:" + qname
@@ -0,0 +1,238 @@
+import json
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+import celery
+from bson import json_util
+from flask import current_app
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.mod_repo import db_handler, file_handler, blob_store, file_transfer
+from app.mod_tm import deployer
+
+# Export and import of the whole repository as one tar.gz stream. Blobs come first,
+# then the manifest of every app and finally the documents in batches of NDJSON, so
+# an importer has all files of an app before it inserts the app's documents:
+#
+#   blobs/<sha256>
+#   apps/<appID>/manifest.json
+#   catalogue/applications-<n>.ndjson
+#   catalogue/transformations-<n>.ndjson
+
+BLOBS_PREFIX = "blobs/"
+APPS_PREFIX = "apps/"
+APPS_DOCS_PREFIX = "catalogue/applications-"
+TRANSFORMATIONS_DOCS_PREFIX = "catalogue/transformations-"
+DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+class CatalogueConflict(Exception):
+    def __init__(self, msg):
+        self.msg = msg
+
+    def __str__(self):
+        return self.msg
+
+
+def export_catalogue(batch_size):
+    manifests = {}
+    for a in db_handler.find_all_apps({"_id": 0, "appInfo.appID": 1, "appInfo.path": 1}):
+        try:
+            manifests[a["appInfo"]["appID"]] = blob_store.load_manifest(a["appInfo"]["path"])
+        except (OSError, ValueError, KeyError) as e:
+            # apps without files in the blob store cannot be restored elsewhere
+            print("app not exported", a["appInfo"]["appID"], e)
+
+    blobs = {}
+    for manifest in manifests.values():
+        for entry in manifest["files"].values():
+            if "sha256" in entry:
+                blobs[entry["sha256"]] = entry["size"]
+
+    def entries():
+        mtime = int(time.time())
+        for digest in sorted(blobs):
+            yield BLOBS_PREFIX + digest, blobs[digest], 0o444, mtime, blob_store.read_blob(digest), None
+        for app_id in sorted(manifests):
+            data = json.dumps(manifests[app_id], sort_keys=True).encode("utf-8")
+            yield APPS_PREFIX + app_id + "/" + blob_store.MANIFEST_NAME, len(data), 0o644, mtime, [data], None
+
+        apps = (a for a in db_handler.find_all_apps() if a["appInfo"]["appID"] in manifests)
+        for name, data in batch_documents(APPS_DOCS_PREFIX, apps, batch_size):
+            yield name, len(data), 0o644, mtime, [data], None
+        transformations = (t for t in db_handler.find_all_transformations() if t.get("appID") in manifests)
+        for name, data in batch_documents(TRANSFORMATIONS_DOCS_PREFIX, transformations, batch_size):
+            yield name, len(data), 0o644, mtime, [data], None
+
+    return blob_store.stream_tar_gz(entries())
+
+
+def batch_documents(prefix, docs, batch_size):
+    batch = []
+    n = 0
+    for doc in docs:
+        batch.append(json_util.dumps(doc))
+        if len(batch) == batch_size:
+            yield "%s%06d.ndjson" % (prefix, n), ("\n".join(batch) + "\n").encode("utf-8")
+            batch = []
+            n += 1
+    if batch:
+        yield "%s%06d.ndjson" % (prefix, n), ("\n".join(batch) + "\n").encode("utf-8")
+
+
+def import_catalogue(stream, build_missing_images=False):
+    report = {"blobs": 0, "blobsStored": 0, "apps": [], "skippedApps": [], "transformations": 0,
+              "missingImages": [], "rebuildingImages": []}
+    manifests = {}
+    imported = set()
+    restored = []
+
+    # imported blobs are staged outside of the store and moved into it app by app,
+    # a concurrent collection only waits for the app being linked
+    staging_path = tempfile.mkdtemp(dir=blob_store.get_uploads_directory_path())
+    try:
+        with tarfile.open(fileobj=stream, mode="r|*") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                f = tar.extractfile(member)
+                if member.name.startswith(BLOBS_PREFIX):
+                    digest = member.name[len(BLOBS_PREFIX):]
+                    if not DIGEST.match(digest):
+                        raise ValueError("invalid blob name: " + member.name)
+                    report["blobs"] += 1
+                    report["blobsStored"] += blob_store.stage_stream(f, digest, staging_path)
+                elif member.name.startswith(APPS_PREFIX) and member.name.endswith("/" + blob_store.MANIFEST_NAME):
+                    app_id = member.name[len(APPS_PREFIX):-len(blob_store.MANIFEST_NAME) - 1]
+                    manifests[app_id] = json.loads(f.read().decode("utf-8"))
+                elif member.name.startswith(APPS_DOCS_PREFIX):
+                    app_ids = import_apps(read_documents(f), manifests, staging_path, restored, report)
+                    imported.update(app_ids)
+                elif member.name.startswith(TRANSFORMATIONS_DOCS_PREFIX):
+                    t_dicts = [t for t in read_documents(f) if t.get("appID") in imported]
+                    db_handler.insert_app_documents([], t_dicts)
+                    report["transformations"] += len(t_dicts)
+    except Exception as e:
+        # an import is all or nothing, apps without their transformations are never left behind
+        roll_back(imported, restored)
+        if isinstance(e, (DuplicateKeyError, BulkWriteError)):
+            raise CatalogueConflict("the catalogue conflicts with the repository: " + str(e))
+        raise
+    finally:
+        shutil.rmtree(staging_path, ignore_errors=True)
+
+    try:
+        missing_images = find_missing_images(imported)
+    except Exception as e:
+        # the catalogue is imported, only the check for local images failed
+        print("images of the imported apps could not be checked", e)
+        report["missingImages"] = None
+        return report
+
+    for app_id, pkg_id in missing_images:
+        report["missingImages"].append(app_id)
+        if build_missing_images:
+            priority = current_app.config["PUBLISH_DEFAULT_PRIORITY"]
+            build_id = db_handler.create_build(None, priority)
+            rebuild_app_image.s(app_id, pkg_id, build_id).set(
+                queue=current_app.config["PUBLISH_BUILD_QUEUE"], priority=priority,
+                soft_time_limit=current_app.config["DOCKER_BUILD_TIMEOUT"] + 60).apply_async()
+            report["rebuildingImages"].append({"appID": app_id, "buildID": build_id})
+
+    return report
+
+
+def roll_back(app_ids, app_paths):
+    try:
+        if app_ids:
+            db_handler.delete_apps(list(app_ids))
+        # a folder whose app is in the database now belongs to a concurrent import
+        owned = db_handler.find_existing_app_ids([os.path.basename(p) for p in app_paths])
+        file_handler.remove_apps_files([p for p in app_paths if os.path.basename(p) not in owned])
+    except Exception as e:
+        print("imported apps could not be removed", e)
+
+
+def read_documents(f):
+    return [json_util.loads(line) for line in f.read().decode("utf-8").splitlines() if line.strip()]
+
+
+def import_apps(app_dicts, manifests, staging_path, restored, report):
+    # apps already in the repository are kept as they are, the folders of the
+    # new ones are linked from the blob store in parallel
+    app_ids = [a["appInfo"]["appID"] for a in app_dicts]
+    existing = db_handler.find_existing_app_ids(app_ids)
+    new_apps = []
+    for app_dict in app_dicts:
+        app_id = app_dict["appInfo"]["appID"]
+        if app_id in existing or app_id not in manifests or not is_safe_app_id(app_id):
+            report["skippedApps"].append(app_id)
+        else:
+            app_dict.pop("_id", None)
+            new_apps.append(app_dict)
+
+    apps_folder = file_handler.get_pub_app_directory_path()
+
+    def restore(app_dict):
+        app_id = app_dict["appInfo"]["appID"]
+        destination = os.path.join(apps_folder, app_id)
+        with blob_store.storing():
+            if os.path.exists(destination):
+                # left over from an app that is no longer in the database
+                file_handler.remove_dir_tree(destination)
+            os.makedirs(destination)
+            restored.append(destination)
+            blob_store.publish_staged(manifests[app_id], staging_path)
+            blob_store.link_manifest(manifests[app_id], destination)
+        app_dict["appInfo"]["path"] = destination
+
+    file_transfer.map_files(restore, new_apps, current_app.config["FILE_TRANSFER_WORKERS"])
+    db_handler.insert_app_documents(new_apps, [])
+    report["apps"].extend(a["appInfo"]["appID"] for a in new_apps)
+
+    return [a["appInfo"]["appID"] for a in new_apps]
+
+
+def is_safe_app_id(app_id):
+    # the app ID names the app's folder
+    return bool(app_id) and "/" not in app_id and "\\" not in app_id and not app_id.startswith(".")
+
+
+def find_missing_images(app_ids):
+    # (appID, pkgID) of the imported apps whose image is not available locally
+    missing = []
+    if not app_ids:
+        return missing
+    for a in db_handler.find_all_apps({"_id": 0, "appInfo.appID": 1, "appInfo.providers": 1}):
+        app_id = a["appInfo"]["appID"]
+        if app_id not in app_ids:
+            continue
+        for p in a["appInfo"].get("providers", []):
+            if p.get("pkgID") and not deployer.image_exists(p["pkgID"]):
+                missing.append((app_id, p["pkgID"]))
+
+    return missing
+
+
+@celery.task
+def rebuild_app_image(app_id, pkg_id, build_id=None):
+    app_dict = db_handler.find_app(app_id)
+    if app_dict is None:
+        if build_id is not None:
+            db_handler.finish_build(build_id, "CANCELLED", {"error": "app not found"})
+        return None
+    app_path = app_dict["appInfo"]["path"]
+    tag = deployer.generate_image_tag(app_dict["appInfo"]["appName"], app_dict["appInfo"]["appVersion"])
+    try:
+        provider = deployer.deploy_app(app_path, tag, base_tag=deployer.get_shared_base_tag(app_path),
+                                       build_id=build_id)
+    except deployer.BuildError as e:
+        print("image of app", app_id, "could not be rebuilt", e)
+        return None
+
+    provider.pop("buildMetrics", None)
+    provider.pop("providerQName", None)
+    db_handler.replace_app_provider(app_id, pkg_id, provider)
+    return provider["pkgID"]
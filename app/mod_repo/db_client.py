@@ -0,0 +1,104 @@
+import os
+import threading
+from pymongo import MongoClient
+
+_client = None
+_client_pid = None
+_client_settings = None
+_lock = threading.Lock()
+
+
+def init_app(app):
+    configure(app.config)
+
+
+def configure(config):
+    global _client_settings
+    with _lock:
+        _client_settings = {
+            "host": config["DB_HOST"],
+            "port": config["DB_PORT"],
+            "db_name": config["DB_NAME"],
+            "app_coll_name": config["APP_COLL_NAME"],
+            "transf_coll_name": config["TRANSF_COLL_NAME"],
+            "meta_coll_name": config["META_COLL_NAME"],
+            "publish_jobs_coll_name": config["PUBLISH_JOBS_COLL_NAME"],
+            "base_images_coll_name": config["BASE_IMAGES_COLL_NAME"],
+            "builds_coll_name": config["BUILDS_COLL_NAME"],
+            "maxPoolSize": config.get("DB_MAX_POOL_SIZE", 100),
+            "minPoolSize": config.get("DB_MIN_POOL_SIZE", 0),
+            "maxIdleTimeMS": config.get("DB_MAX_IDLE_TIME_MS"),
+            "connectTimeoutMS": config.get("DB_CONNECT_TIMEOUT_MS", 20000),
+            "socketTimeoutMS": config.get("DB_SOCKET_TIMEOUT_MS"),
+            "serverSelectionTimeoutMS": config.get("DB_SERVER_SELECTION_TIMEOUT_MS", 30000),
+            "waitQueueTimeoutMS": config.get("DB_WAIT_QUEUE_TIMEOUT_MS")
+        }
+    reset()
+
+
+def _create_client(settings):
+    # connect=False defers the connection until the first operation, so a client
+    # created in a parent process is never shared with forked children
+    return MongoClient(
+        settings["host"],
+        settings["port"],
+        connect=False,
+        maxPoolSize=settings["maxPoolSize"],
+        minPoolSize=settings["minPoolSize"],
+        maxIdleTimeMS=settings["maxIdleTimeMS"],
+        connectTimeoutMS=settings["connectTimeoutMS"],
+        socketTimeoutMS=settings["socketTimeoutMS"],
+        serverSelectionTimeoutMS=settings["serverSelectionTimeoutMS"],
+        waitQueueTimeoutMS=settings["waitQueueTimeoutMS"]
+    )
+
+
+def get_client() -> MongoClient:
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client_settings is None:
+                raise RuntimeError("database client is not configured, call db_client.init_app(app) first")
+            if _client is None or _client_pid != pid:
+                # the pool of a client inherited through fork must not be reused
+                _client = _create_client(_client_settings)
+                _client_pid = pid
+    return _client
+
+
+def get_db():
+    return get_client()[_client_settings["db_name"]]
+
+
+def get_apps_collection():
+    return get_db()[_client_settings["app_coll_name"]]
+
+
+def get_transformations_collection():
+    return get_db()[_client_settings["transf_coll_name"]]
+
+
+def get_meta_collection():
+    return get_db()[_client_settings["meta_coll_name"]]
+
+
+def get_publish_jobs_collection():
+    return get_db()[_client_settings["publish_jobs_coll_name"]]
+
+
+def get_base_images_collection():
+    return get_db()[_client_settings["base_images_coll_name"]]
+
+
+def get_builds_collection():
+    return get_db()[_client_settings["builds_coll_name"]]
+
+
+def reset():
+    global _client, _client_pid
+    with _lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
@@ -1,38 +1,139 @@
-from pymongo import MongoClient
-from flask import current_app
+import base64
+import hashlib
+import json
+from datetime import datetime
 from bson.objectid import ObjectId
+from pymongo import ASCENDING, UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
 from app.mod_repo.models import ApplicationSpecification
+from app.mod_repo import db_client, signature_index, cache
 from typing import List
 from pprint import pprint
 
 
 def store_app(app_obj: ApplicationSpecification) -> ApplicationSpecification:
-    try:
-        client = MongoClient(current_app.config["DB_HOST"], current_app.config["DB_PORT"])
-        db = client[current_app.config["DB_NAME"]]
-        apps_collection = db[current_app.config["APP_COLL_NAME"]]
-        trfs_collection = db[current_app.config["TRANSF_COLL_NAME"]]
+    store_apps([app_obj])
+
+    return app_obj
+
+
+def store_apps(app_objs: List[ApplicationSpecification]) -> dict:
+    # one ordered insert_many per collection instead of a round trip per document,
+    # returns the generated ids {appID: {"_id": ..., "transformations": [...]}}
+    apps_collection = db_client.get_apps_collection()
+    trfs_collection = db_client.get_transformations_collection()
 
+    # ids are generated upfront so the apps are inserted first: publishing an app
+    # twice fails on the unique appID index before any transformation is written
+    app_dicts = []
+    t_dicts = []
+    ids = {}
+    for app_obj in app_objs:
         for t in app_obj.t_specs:
+            t.id = str(ObjectId())
             t_dict = t.to_dict()
             t_dict.pop('transformationID', None)
-            t_id = trfs_collection.insert_one(t_dict).inserted_id
-            t.id = str(t_id)
+            t_dict["_id"] = ObjectId(t.id)
+            t_dict[CONTENT_HASH] = compute_content_hash(t_dict)
+            # written with the document, a stored transformation is always discoverable
+            t_dict[signature_index.FIELD] = signature_index.build(t_dict)
+            t_dicts.append(t_dict)
+
+        app_dict = app_obj.to_dict()
+        app_dict[CONTENT_HASH] = compute_content_hash(app_dict)
+        app_dict["_id"] = ObjectId()
+        app_dicts.append(app_dict)
+        ids[app_obj.app_info.id] = {"_id": str(app_dict["_id"]), "transformations": [t.id for t in app_obj.t_specs]}
 
-        app_id = apps_collection.insert_one(app_obj.to_dict()).inserted_id
-
-        return app_obj
-    except:
-        # TODO: add error handling
+    try:
+        apps_collection.insert_many(app_dicts, ordered=True)
+        if t_dicts:
+            trfs_collection.insert_many(t_dicts, ordered=True)
+    except PyMongoError as e:
+        # whatever failed (a duplicate key, a lost connection...), only documents
+        # with the ids generated above are removed, never those of another app
+        try:
+            trfs_collection.delete_many({"_id": {"$in": [t["_id"] for t in t_dicts]}})
+            apps_collection.delete_many({"_id": {"$in": [a["_id"] for a in app_dicts]}})
+        except PyMongoError as cleanup_error:
+            print("documents of the failed write could not be removed", cleanup_error)
+        if isinstance(e, BulkWriteError):
+            errors = e.details.get("writeErrors", [])
+            if errors and errors[0].get("code") == 11000:
+                raise DuplicateKeyError(errors[0].get("errmsg"), 11000)
         raise
 
+    bump_collection_version(apps_collection.name)
+
+    keys = []
+    for app_obj in app_objs:
+        keys.append(cache.app_key(app_obj.app_info.id))
+        for t in app_obj.t_specs:
+            keys.append(cache.transformation_id_key(t.id))
+            if t.qname:
+                keys.append(cache.transformation_qname_key(t.qname))
+    cache.invalidate(keys)
+
+    return ids
+
+
+CONTENT_HASH = "contentHash"
+
+
+def compute_content_hash(doc) -> str:
+    # derived fields are left out, re-indexing a document does not change its content
+    doc = {k: v for k, v in doc.items() if k not in (CONTENT_HASH, signature_index.FIELD, "_id")}
+    data = json.dumps(doc, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def find_published_version(app_id: str):
+    # what an identical re-publish of the app needs to short-circuit
+    apps_collection = db_client.get_apps_collection()
+
+    return apps_collection.find_one({"appInfo.appID": app_id},
+                                    {"_id": 0, "appInfo.packageHash": 1, "appInfo.providers": 1})
+
+
+def get_collection_version(coll_name: str) -> int:
+    meta_collection = db_client.get_meta_collection()
+
+    result = meta_collection.find_one({"_id": coll_name})
+    if result is None:
+        return 0
+
+    return result["version"]
+
+
+def get_apps_version() -> int:
+    return get_collection_version(db_client.get_apps_collection().name)
+
+
+def bump_collection_version(coll_name: str):
+    meta_collection = db_client.get_meta_collection()
+    meta_collection.update_one({"_id": coll_name}, {"$inc": {"version": 1}}, upsert=True)
+
 
 def find_app(app_id: str):
-    client = MongoClient(current_app.config["DB_HOST"], current_app.config["DB_PORT"])
-    db = client[current_app.config["DB_NAME"]]
-    apps_collection = db[current_app.config["APP_COLL_NAME"]]
+    return find_app_and_content_hash(app_id)[0]
+
+
+def find_app_and_content_hash(app_id: str):
+    # the hash is taken from the same (possibly cached) document, an ETag never
+    # belongs to another version than the body
+    doc = cache.get_or_load(cache.app_key(app_id), lambda: load_app(app_id))
+    if doc is None:
+        return None, None
+
+    return doc, doc.pop(CONTENT_HASH, None)
+
+
+def load_app(app_id: str):
+    apps_collection = db_client.get_apps_collection()
 
     result = apps_collection.find_one({"appInfo.appID": app_id})
+    if result is None:
+        return None
 
     result.pop('_id', None)
     for t in result["transformations"]:
@@ -42,9 +143,7 @@ def find_app(app_id: str):
 
 
 def find_apps_by_tags(tags: List[str]):
-    client = MongoClient(current_app.config["DB_HOST"], current_app.config["DB_PORT"])
-    db = client[current_app.config["DB_NAME"]]
-    apps_collection = db[current_app.config["APP_COLL_NAME"]]
+    apps_collection = db_client.get_apps_collection()
 
     if len(tags) > 0:
         results = list(apps_collection.find({"appInfo.tags": {"$in": tags}}))
@@ -53,41 +152,124 @@ def find_apps_by_tags(tags: List[str]):
 
     for r in results:
         r.pop('_id', None)
+        r.pop(CONTENT_HASH, None)
         for t in r["transformations"]:
             t.pop('_id', None)
 
     return results
 
 
-def find_app_transformations(app_id: str):
-    client = MongoClient(current_app.config["DB_HOST"], current_app.config["DB_PORT"])
-    db = client[current_app.config["DB_NAME"]]
-    apps_collection = db[current_app.config["APP_COLL_NAME"]]
+APP_FIELDS = ["appInfo", "transformations", "dependencies", "configs", "invocations", "testRuns"]
 
-    result = apps_collection.find_one({"appInfo.appID": app_id})
 
-    for t in result["transformations"]:
-        t.pop('_id', None)
+def encode_page_token(app_id: str) -> str:
+    return base64.urlsafe_b64encode(app_id.encode("utf-8")).decode("ascii")
+
+
+def decode_page_token(token: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8")
+    except Exception:
+        raise ValueError("invalid page token")
+
 
-    return result["transformations"]
+def build_apps_projection(fields: List[str]=None) -> dict:
+    if not fields:
+        return {"_id": 0, "appInfo.path": 0, CONTENT_HASH: 0}
+
+    projection = {"_id": 0}
+    for f in fields:
+        if f.split(".")[0] not in APP_FIELDS:
+            raise ValueError("unknown field " + f)
+        projection[f] = 1
+
+    return projection
+
+
+def find_apps_page(tags: List[str], fields: List[str]=None, limit: int=None, page_token: str=None):
+    apps_collection = db_client.get_apps_collection()
+
+    query = {}
+    if len(tags) > 0:
+        query["appInfo.tags"] = {"$in": tags}
+    if page_token:
+        query["appInfo.appID"] = {"$gt": decode_page_token(page_token)}
+
+    # the page boundary is looked up with a cheap appID-only query first, so the
+    # next token is known before the page itself is read and can be streamed
+    next_token = None
+    if limit:
+        boundary = list(apps_collection.find(query, {"_id": 0, "appInfo.appID": 1})
+                        .sort("appInfo.appID", ASCENDING).skip(limit - 1).limit(2))
+        if boundary:
+            # the page is bounded by the boundary instead of the limit: an app inserted
+            # in between makes the page longer instead of being skipped by the next token
+            last_id = boundary[0]["appInfo"]["appID"]
+            query["appInfo.appID"] = dict(query.get("appInfo.appID", {}), **{"$lte": last_id})
+        if len(boundary) == 2:
+            next_token = encode_page_token(last_id)
+
+    # without a boundary fewer apps than the limit match and the page is not cut either
+    cursor = apps_collection.find(query, build_apps_projection(fields)).sort("appInfo.appID", ASCENDING)
+
+    return cursor, next_token
+
+
+def find_app_transformations(app_id: str):
+    app = find_app(app_id)
+    if app is None:
+        return None
+
+    return app["transformations"]
 
 
 def delete_app(app_id):
-    client = MongoClient(current_app.config["DB_HOST"], current_app.config["DB_PORT"])
-    db = client[current_app.config["DB_NAME"]]
-    apps_collection = db[current_app.config["APP_COLL_NAME"]]
-    trfs_collection = db[current_app.config["TRANSF_COLL_NAME"]]
+    return len(delete_apps([app_id])) > 0
 
-    trfs_collection.delete_many({"appID": app_id})
-    apps_collection.delete_one({"appInfo.appID": app_id})
 
-    return True
+def delete_apps(app_ids: List[str]) -> dict:
+    # removes the apps and their transformations, returns {appID: path} of the deleted apps
+    apps_collection = db_client.get_apps_collection()
+    trfs_collection = db_client.get_transformations_collection()
+
+    paths = {}
+    for a in apps_collection.find({"appInfo.appID": {"$in": app_ids}}, {"appInfo.appID": 1, "appInfo.path": 1}):
+        paths[a["appInfo"]["appID"]] = a["appInfo"].get("path")
+    if not paths:
+        return paths
+    found_ids = list(paths)
+
+    keys = [cache.app_key(app_id) for app_id in found_ids]
+    for t in trfs_collection.find({"appID": {"$in": found_ids}}, {"qname": 1}):
+        keys.append(cache.transformation_id_key(str(t["_id"])))
+        if t.get("qname"):
+            keys.append(cache.transformation_qname_key(t["qname"]))
+
+    # transformations go first, an app is never left with only some of them
+    trfs_collection.delete_many({"appID": {"$in": found_ids}})
+    apps_collection.delete_many({"appInfo.appID": {"$in": found_ids}})
+    db_client.get_base_images_collection().update_many(
+        {"apps": {"$in": found_ids}}, {"$pull": {"apps": {"$in": found_ids}}})
+    bump_collection_version(apps_collection.name)
+    cache.invalidate(keys)
+
+    return paths
 
 
 def find_transformation_by_id(t_id):
-    client = MongoClient(current_app.config["DB_HOST"], current_app.config["DB_PORT"])
-    db = client[current_app.config["DB_NAME"]]
-    trfs_collection = db[current_app.config["TRANSF_COLL_NAME"]]
+    return find_transformation_and_content_hash(t_id)[0]
+
+
+def find_transformation_and_content_hash(t_id):
+    doc = cache.get_or_load(cache.transformation_id_key(t_id), lambda: load_transformation_by_id(t_id))
+    if doc is None:
+        return None, None
+
+    return doc, doc.pop(CONTENT_HASH, None)
+
+
+def load_transformation_by_id(t_id):
+    trfs_collection = db_client.get_transformations_collection()
 
     result = trfs_collection.find_one({"_id": ObjectId(t_id)})
     id = str(result["_id"])
@@ -98,9 +280,15 @@ def find_transformation_by_id(t_id):
 
 
 def find_transformation_by_qname(qname):
-    client = MongoClient(current_app.config["DB_HOST"], current_app.config["DB_PORT"])
-    db = client[current_app.config["DB_NAME"]]
-    trfs_collection = db[current_app.config["TRANSF_COLL_NAME"]]
+    doc = cache.get_or_load(cache.transformation_qname_key(qname), lambda: load_transformation_by_qname(qname))
+    if doc is not None:
+        doc.pop(CONTENT_HASH, None)
+
+    return doc
+
+
+def load_transformation_by_qname(qname):
+    trfs_collection = db_client.get_transformations_collection()
 
     result = trfs_collection.find_one({"qname": qname})
     id = str(result["_id"])
@@ -111,20 +299,478 @@ def find_transformation_by_qname(qname):
 
 
 def find_transformation_by_signature(signature: str, strict=False):
-    client = MongoClient(current_app.config["DB_HOST"], current_app.config["DB_PORT"])
-    db = client[current_app.config["DB_NAME"]]
-    trfs_collection = db[current_app.config["TRANSF_COLL_NAME"]]
+    trfs_collection = db_client.get_transformations_collection()
 
-    print(signature)
+    digest = signature_index.signature_digest(signature)
 
     if strict:
-        results = list(trfs_collection.find({"strictSignature": signature}))
+        results = list(trfs_collection.find({"strictSignatureDigest": digest}))
     else:
-        results = list(trfs_collection.find({"relaxedSignature": signature}))
+        results = list(trfs_collection.find({"relaxedSignatureDigest": digest}))
 
     for r in results:
         id = str(r["_id"])
         r.pop('_id', None)
+        r.pop(CONTENT_HASH, None)
         r["transformationID"] = id
 
-    return results
\ No newline at end of file
+    return results
+
+
+def find_transformations_by_structure(sig_query: signature_index.SignatureQuery):
+    trfs_collection = db_client.get_transformations_collection()
+
+    results = sig_query.rank(trfs_collection.find(sig_query.to_mongo_query()))
+
+    for r in results:
+        id = str(r["_id"])
+        r.pop('_id', None)
+        r.pop(CONTENT_HASH, None)
+        r["transformationID"] = id
+
+    return results
+
+
+def migrate_signatures(batch_size=500):
+    # rewrites the canonical signatures, their digests and the structured
+    # signature index of transformations stored by older versions
+    trfs_collection = db_client.get_transformations_collection()
+
+    updated = 0
+    batch = []
+    keys = set()
+    for t in trfs_collection.find():
+        keys.add(cache.transformation_id_key(str(t["_id"])))
+        if t.get("qname"):
+            keys.add(cache.transformation_qname_key(t["qname"]))
+        strict, relaxed = signature_index.signatures_from_dict(t)
+        t.update({
+            "strictSignature": strict,
+            "relaxedSignature": relaxed,
+            "strictSignatureDigest": signature_index.signature_digest(strict),
+            "relaxedSignatureDigest": signature_index.signature_digest(relaxed),
+            signature_index.FIELD: signature_index.build(t)
+        })
+        t_id = t.pop("_id")
+        t[CONTENT_HASH] = compute_content_hash(t)
+        batch.append(UpdateOne({"_id": t_id}, {"$set": t}))
+        if len(batch) == batch_size:
+            updated += trfs_collection.bulk_write(batch, ordered=False).modified_count
+            cache.invalidate(list(keys))
+            batch = []
+            keys = set()
+    if len(batch) > 0:
+        updated += trfs_collection.bulk_write(batch, ordered=False).modified_count
+        cache.invalidate(list(keys))
+
+    return updated
+
+
+def backfill_content_hashes(batch_size=500):
+    # apps and transformations stored before content hashes were introduced get
+    # theirs, conditional GETs answer with an ETag for them afterwards
+    apps_collection = db_client.get_apps_collection()
+    trfs_collection = db_client.get_transformations_collection()
+
+    def cache_keys(collection, doc):
+        if collection is apps_collection:
+            return [cache.app_key(doc["appInfo"]["appID"])]
+        keys = [cache.transformation_id_key(str(doc["_id"]))]
+        if doc.get("qname"):
+            keys.append(cache.transformation_qname_key(doc["qname"]))
+        return keys
+
+    updated = 0
+    apps_updated = 0
+    for collection in (apps_collection, trfs_collection):
+        batch = []
+        keys = []
+        for doc in collection.find({CONTENT_HASH: {"$exists": False}}):
+            batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {CONTENT_HASH: compute_content_hash(doc)}}))
+            keys.extend(cache_keys(collection, doc))
+            if len(batch) == batch_size:
+                updated += collection.bulk_write(batch, ordered=False).modified_count
+                cache.invalidate(keys)
+                batch = []
+                keys = []
+        if len(batch) > 0:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            cache.invalidate(keys)
+        if collection is apps_collection:
+            apps_updated = updated
+
+    if apps_updated > 0:
+        # the listing's ETag changes with the documents it returns
+        bump_collection_version(apps_collection.name)
+
+    return updated
+
+
+def find_all_apps(projection=None):
+    apps_collection = db_client.get_apps_collection()
+    return apps_collection.find({}, projection).sort("appInfo.appID", ASCENDING)
+
+
+def find_all_transformations():
+    trfs_collection = db_client.get_transformations_collection()
+    return trfs_collection.find().sort("appID", ASCENDING)
+
+
+def find_existing_app_ids(app_ids: List[str]) -> set:
+    apps_collection = db_client.get_apps_collection()
+    query = {"appInfo.appID": {"$in": app_ids}}
+    return set(a["appInfo"]["appID"] for a in apps_collection.find(query, {"_id": 0, "appInfo.appID": 1}))
+
+
+def insert_app_documents(app_dicts: List[dict], t_dicts: List[dict]):
+    # stores already serialized apps and transformations, e.g. of an imported catalogue
+    apps_collection = db_client.get_apps_collection()
+    trfs_collection = db_client.get_transformations_collection()
+
+    keys = []
+    for app_dict in app_dicts:
+        app_dict[CONTENT_HASH] = compute_content_hash(app_dict)
+        keys.append(cache.app_key(app_dict["appInfo"]["appID"]))
+    for t_dict in t_dicts:
+        t_dict[CONTENT_HASH] = compute_content_hash(t_dict)
+        keys.append(cache.transformation_id_key(str(t_dict["_id"])))
+        if t_dict.get("qname"):
+            keys.append(cache.transformation_qname_key(t_dict["qname"]))
+
+    try:
+        if app_dicts:
+            apps_collection.insert_many(app_dicts, ordered=True)
+        if t_dicts:
+            trfs_collection.insert_many(t_dicts, ordered=True)
+    except PyMongoError:
+        # apps got new ids on insert, transformations keep theirs and may collide
+        # with a document of another app, which is spared by the appID filter
+        try:
+            app_ids = [a["appInfo"]["appID"] for a in app_dicts] + [t.get("appID") for t in t_dicts]
+            trfs_collection.delete_many({"_id": {"$in": [t["_id"] for t in t_dicts if "_id" in t]}, "appID": {"$in": app_ids}})
+            apps_collection.delete_many({"_id": {"$in": [a["_id"] for a in app_dicts if "_id" in a]}})
+        except PyMongoError as cleanup_error:
+            print("documents of the failed write could not be removed", cleanup_error)
+        raise
+    bump_collection_version(apps_collection.name)
+    cache.invalidate(keys)
+
+
+def replace_app_provider(app_id: str, pkg_id: str, provider: dict):
+    # points the app and its transformations to a newly built image
+    apps_collection = db_client.get_apps_collection()
+    trfs_collection = db_client.get_transformations_collection()
+
+    def replace(providers):
+        for p in providers:
+            if p.get("pkgID") == pkg_id:
+                p.update(provider)
+
+    app_dict = apps_collection.find_one({"appInfo.appID": app_id})
+    if app_dict is None:
+        return False
+    replace(app_dict["appInfo"]["providers"])
+    for t in app_dict.get("transformations", []):
+        replace(t.get("providers", []))
+    app_dict[CONTENT_HASH] = compute_content_hash(app_dict)
+
+    keys = [cache.app_key(app_id)]
+    batch = []
+    for t in trfs_collection.find({"appID": app_id}):
+        replace(t.get("providers", []))
+        t[CONTENT_HASH] = compute_content_hash(t)
+        batch.append(UpdateOne({"_id": t["_id"]}, {"$set": {"providers": t["providers"], CONTENT_HASH: t[CONTENT_HASH]}}))
+        keys.append(cache.transformation_id_key(str(t["_id"])))
+        if t.get("qname"):
+            keys.append(cache.transformation_qname_key(t["qname"]))
+
+    apps_collection.replace_one({"_id": app_dict["_id"]}, app_dict)
+    if batch:
+        trfs_collection.bulk_write(batch, ordered=False)
+    bump_collection_version(apps_collection.name)
+    cache.invalidate(keys)
+
+    return True
+
+
+def create_publish_job(request_body, stages: List[str]) -> str:
+    jobs_collection = db_client.get_publish_jobs_collection()
+
+    job = {
+        "state": "PENDING",
+        "name": request_body.get("name"),
+        "archiveURL": request_body.get("archiveURL"),
+        "appID": None,
+        "pkgID": None,
+        "buildID": None,
+        "deduplicated": False,
+        "error": None,
+        "createdAt": datetime.utcnow(),
+        "stages": [{"name": s, "state": "PENDING"} for s in stages]
+    }
+
+    return str(jobs_collection.insert_one(job).inserted_id)
+
+
+def update_publish_stage(job_id: str, stage: str, fields: dict, job_state: str=None, error=None):
+    jobs_collection = db_client.get_publish_jobs_collection()
+
+    update = {"stages.$." + k: v for k, v in fields.items()}
+    update["state"] = job_state or "PROGRESS"
+    if error is not None:
+        update["error"] = dict(error, stage=stage)
+
+    jobs_collection.update_one({"_id": ObjectId(job_id), "stages.name": stage}, {"$set": update})
+
+
+def update_publish_job(job_id: str, fields: dict):
+    jobs_collection = db_client.get_publish_jobs_collection()
+    jobs_collection.update_one({"_id": ObjectId(job_id)}, {"$set": fields})
+
+
+def set_publish_job_app(job_id: str, app_id: str):
+    jobs_collection = db_client.get_publish_jobs_collection()
+    jobs_collection.update_one({"_id": ObjectId(job_id)}, {"$set": {"appID": app_id}})
+
+
+def find_publish_job(job_id: str):
+    jobs_collection = db_client.get_publish_jobs_collection()
+
+    if not ObjectId.is_valid(job_id):
+        return None
+    result = jobs_collection.find_one({"_id": ObjectId(job_id)})
+    if result is None:
+        return None
+
+    result["jobID"] = str(result.pop("_id"))
+    result["createdAt"] = result["createdAt"].isoformat()
+    for stage in result["stages"]:
+        for k in ("startedAt", "finishedAt"):
+            if k in stage:
+                stage[k] = stage[k].isoformat()
+
+    return result
+
+
+def create_build(tag: str, priority: int, job_id: str=None) -> str:
+    builds_collection = db_client.get_builds_collection()
+
+    build = {
+        "state": "QUEUED",
+        "tag": tag,
+        "priority": priority,
+        "jobID": job_id,
+        "imageID": None,
+        "error": None,
+        "cancelRequested": False,
+        "createdAt": datetime.utcnow(),
+        "log": []
+    }
+
+    return str(builds_collection.insert_one(build).inserted_id)
+
+
+def start_build(build_id: str, tag: str):
+    # None if the build was cancelled while it was queued
+    builds_collection = db_client.get_builds_collection()
+    return builds_collection.find_one_and_update(
+        {"_id": ObjectId(build_id), "state": "QUEUED"},
+        {"$set": {"state": "RUNNING", "tag": tag, "startedAt": datetime.utcnow()}},
+        projection={"log": 0}, return_document=ReturnDocument.AFTER)
+
+
+def append_build_log(build_id: str, lines: List[str], max_lines: int) -> bool:
+    # returns True if the build should be cancelled
+    builds_collection = db_client.get_builds_collection()
+    update = {"$currentDate": {"heartbeatAt": True}}
+    if lines:
+        update["$push"] = {"log": {"$each": lines, "$slice": -max_lines}}
+    result = builds_collection.find_one_and_update({"_id": ObjectId(build_id)}, update,
+                                                   projection={"cancelRequested": 1})
+
+    return result is None or result.get("cancelRequested", False)
+
+
+def finish_build(build_id: str, state: str, fields: dict):
+    builds_collection = db_client.get_builds_collection()
+    update = dict(fields, state=state, finishedAt=datetime.utcnow())
+    builds_collection.update_one({"_id": ObjectId(build_id)}, {"$set": update})
+
+
+def cancel_build(build_id: str):
+    # a queued build is cancelled right away, a running one by the worker building it
+    builds_collection = db_client.get_builds_collection()
+    if not ObjectId.is_valid(build_id):
+        return None
+    builds_collection.update_one({"_id": ObjectId(build_id), "state": "QUEUED"},
+                                 {"$set": {"state": "CANCELLED", "finishedAt": datetime.utcnow()}})
+    builds_collection.update_one({"_id": ObjectId(build_id), "state": {"$in": ["QUEUED", "RUNNING", "CANCELLED"]}},
+                                 {"$set": {"cancelRequested": True}})
+
+    return find_build(build_id)
+
+
+def find_build(build_id: str, log_lines: int=None):
+    builds_collection = db_client.get_builds_collection()
+
+    if not ObjectId.is_valid(build_id):
+        return None
+    projection = {"log": {"$slice": -log_lines}} if log_lines is not None else None
+    result = builds_collection.find_one({"_id": ObjectId(build_id)}, projection)
+    if result is None:
+        return None
+
+    result["buildID"] = str(result.pop("_id"))
+    return result
+
+
+def register_base_image(fingerprint: str, tag: str, app_id: str, image_id: str=None):
+    base_images_collection = db_client.get_base_images_collection()
+
+    update = {
+        "$set": {"tag": tag, "updatedAt": datetime.utcnow()},
+        "$setOnInsert": {"createdAt": datetime.utcnow()},
+        "$addToSet": {"apps": app_id}
+    }
+    if image_id is not None:
+        update["$set"]["imageID"] = image_id
+    base_images_collection.update_one({"_id": fingerprint}, update, upsert=True)
+
+
+def get_base_images_report():
+    base_images_collection = db_client.get_base_images_collection()
+
+    pipeline = [
+        {"$project": {"_id": 0, "fingerprint": "$_id", "tag": 1, "imageID": 1, "apps": 1,
+                      "appsCount": {"$size": "$apps"}}},
+        {"$sort": {"appsCount": -1}}
+    ]
+    base_images = list(base_images_collection.aggregate(pipeline))
+
+    return {
+        "baseImages": base_images,
+        "apps": sum(b["appsCount"] for b in base_images),
+        "sharedBy": sum(b["appsCount"] for b in base_images if b["appsCount"] > 1)
+    }
+
+
+# indexes backing every lookup of this module: (collection getter, keys, options)
+INDEXES = [
+    (db_client.get_apps_collection, [("appInfo.appID", ASCENDING)], {"name": "appID_unique", "unique": True}),
+    (db_client.get_apps_collection, [("appInfo.tags", ASCENDING)], {"name": "tags"}),
+    (db_client.get_transformations_collection, [("appID", ASCENDING)], {"name": "appID"}),
+    (db_client.get_transformations_collection, [("strictSignatureDigest", ASCENDING)],
+     {"name": "strictSignatureDigest"}),
+    (db_client.get_transformations_collection, [("relaxedSignatureDigest", ASCENDING)],
+     {"name": "relaxedSignatureDigest"}),
+    # transformations without a qname are stored with an empty string, keep them out of the unique index
+    (db_client.get_transformations_collection, [("qname", ASCENDING)],
+     {"name": "qname_unique", "unique": True, "partialFilterExpression": {"qname": {"$gt": ""}}}),
+    (db_client.get_transformations_collection,
+     [(signature_index.FIELD + ".outputFormats", ASCENDING), (signature_index.FIELD + ".paramsTotal", ASCENDING)],
+     {"name": "signatureIndex_outputs"}),
+    (db_client.get_transformations_collection, [(signature_index.FIELD + ".inputFormats", ASCENDING)],
+     {"name": "signatureIndex_inputs"}),
+    (db_client.get_transformations_collection, [(signature_index.FIELD + ".requiredInputsKey", ASCENDING)],
+     {"name": "signatureIndex_requiredInputs"}),
+    (db_client.get_base_images_collection, [("apps", ASCENDING)], {"name": "apps"})
+]
+
+
+# representative filters of the hot queries: name -> (collection getter, operation, filter)
+QUERIES = {
+    "find_app": (db_client.get_apps_collection, "find", {"appInfo.appID": ""}),
+    "find_apps_by_tags": (db_client.get_apps_collection, "find", {"appInfo.tags": {"$in": [""]}}),
+    "delete_app.transformations": (db_client.get_transformations_collection, "delete", {"appID": ""}),
+    "delete_app.application": (db_client.get_apps_collection, "delete", {"appInfo.appID": ""}),
+    "find_transformation_by_id": (db_client.get_transformations_collection, "find", {"_id": ObjectId()}),
+    "find_transformation_by_qname": (db_client.get_transformations_collection, "find", {"qname": ""}),
+    "find_transformation_by_signature.strict": (db_client.get_transformations_collection, "find",
+                                                {"strictSignatureDigest": ""}),
+    "find_transformation_by_signature.relaxed": (db_client.get_transformations_collection, "find",
+                                                 {"relaxedSignatureDigest": ""}),
+    "find_transformations_by_structure.subset": (
+        db_client.get_transformations_collection, "find",
+        signature_index.SignatureQuery(signature_index.MATCH_SUBSET, pnum=0, infiles=[""], outfiles=[""])
+        .to_mongo_query()),
+    "find_transformations_by_structure.subset_inputs": (
+        db_client.get_transformations_collection, "find",
+        signature_index.SignatureQuery(signature_index.MATCH_SUBSET, infiles=[""]).to_mongo_query()),
+    "find_transformations_by_structure.superset": (
+        db_client.get_transformations_collection, "find",
+        signature_index.SignatureQuery(signature_index.MATCH_SUPERSET, pnum=0, infiles=[""], outfiles=[""])
+        .to_mongo_query())
+}
+
+
+def ensure_indexes():
+    # an index that cannot be built (e.g. unique over duplicate documents) does
+    # not keep the others from being created, failures are returned by index name
+    created = []
+    failed = {}
+    for get_collection, keys, options in INDEXES:
+        collection = get_collection()
+        try:
+            created.append(collection.name + "." + collection.create_index(keys, **options))
+        except OperationFailure as e:
+            failed[collection.name + "." + options["name"]] = str(e)
+
+    return created, failed
+
+
+def get_index_stats():
+    stats = {}
+    for get_collection in (db_client.get_apps_collection, db_client.get_transformations_collection):
+        collection = get_collection()
+        usage = {}
+        for s in collection.aggregate([{"$indexStats": {}}]):
+            usage[s["name"]] = {"ops": s["accesses"]["ops"], "since": s["accesses"]["since"].isoformat()}
+
+        indexes = []
+        for name, info in collection.index_information().items():
+            indexes.append({
+                "name": name,
+                "keys": [k for k, _ in info["key"]],
+                "unique": info.get("unique", False),
+                "usage": usage.get(name)
+            })
+        stats[collection.name] = indexes
+
+    return stats
+
+
+def explain_queries():
+    plans = {}
+    for name, (get_collection, operation, query) in QUERIES.items():
+        collection = get_collection()
+        if operation == "delete":
+            explain = collection.database.command(
+                "explain",
+                {"delete": collection.name, "deletes": [{"q": query, "limit": 0}]},
+                verbosity="queryPlanner"
+            )
+        else:
+            explain = collection.find(query).explain()
+
+        plan = summarize_query_plan(explain["queryPlanner"]["winningPlan"])
+        plan["collection"] = collection.name
+        plans[name] = plan
+
+    return plans
+
+
+def summarize_query_plan(winning_plan) -> dict:
+    stages = []
+    indexes = []
+    stage = winning_plan
+    while stage is not None:
+        stages.append(stage["stage"])
+        if "indexName" in stage:
+            indexes.append(stage["indexName"])
+        stage = stage.get("inputStage")
+
+    return {
+        "stages": stages,
+        "indexes": indexes,
+        "collectionScan": "COLLSCAN" in stages
+    }
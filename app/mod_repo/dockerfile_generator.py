@@ -1,7 +1,35 @@
+import hashlib
+import json
 import os
 from app.mod_repo.models import ApplicationSpecification, EnvironmentDependency, SoftwareDependency
 from typing import List
 
+# Instructions are ordered from the least to the most frequently changing ones, so
+# Docker can reuse the cached layers of a previous build: base image, environment,
+# software dependencies and only then the application files. Only dependencies
+# declared independent of the app files ("usesAppFiles": false) are installed
+# before copying them, all others keep running after the copy as they always did.
+
+DEFAULT_BASE_IMAGE = "ubuntu:14.04"
+
+APP_FOLDER_ENV_VARS = [
+    ("APPHOME", "/app"),
+    ("DEPHOME", "/dep"),
+    ("SCHEMAS", "/schemas"),
+    ("TESTRUNS", "/testruns"),
+    ("INPUT", "/input")
+]
+
+# package manager caches kept between builds when BuildKit is used
+CACHE_MOUNTS = [
+    "--mount=type=cache,target=/var/cache/apt,sharing=locked",
+    "--mount=type=cache,target=/var/lib/apt/lists,sharing=locked",
+    "--mount=type=cache,target=/root/.cache/pip",
+    "--mount=type=cache,target=/root/.npm"
+]
+
+BASE_DOCKERFILE_NAME = "Dockerfile.base"
+
 
 def write_instructions_to_dockerfile(data, file):
     if isinstance(data, str):
@@ -14,33 +42,126 @@ def write_instructions_to_dockerfile(data, file):
         pass
 
 
+def quote_env_value(value):
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def uses_app_files(dep: SoftwareDependency):
+    return dep.uses_app_files or bool(dep.path)
+
+
+def split_soft_deps(soft_dependencies: List[SoftwareDependency]):
+    # (deps installable without the app files, deps that need them)
+    return [d for d in soft_dependencies if not uses_app_files(d)], [d for d in soft_dependencies if uses_app_files(d)]
+
+
+def base_image_fingerprint(pkg_spec: ApplicationSpecification, base_image=None):
+    # identifies the image that results from installing the app's dependencies,
+    # apps with the same fingerprint can share one base image
+    soft_deps = split_soft_deps(pkg_spec.dep_specs.soft_deps)[0]
+    if not soft_deps:
+        return None
+    # every variable is part of it, tools also read variables that no command
+    # mentions (DEBIAN_FRONTEND, proxies, PIP_INDEX_URL...), in the order they are set
+    normalized = {
+        "from": base_image or DEFAULT_BASE_IMAGE,
+        "env": [[dep.name, str(dep.value)] for dep in pkg_spec.dep_specs.env_deps],
+        "commands": [[" ".join(cmd.split()) for cmd in dep.commands] for dep in soft_deps]
+    }
+    data = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def generate_base_image_tag(tag_prefix, fingerprint):
+    return tag_prefix + "base:" + fingerprint[:16]
+
+
+def generate_env_instructions(env_dependencies: List[EnvironmentDependency], cache_mounts):
+    # the folder variables come first in an instruction of their own, an ENV
+    # instruction only sees the values set by the instructions before it, so
+    # every dependency gets its own one in the order of the specification
+    results = ["\n#Application Package Environment Variables"]
+    results.append("ENV " + " ".join(k + "=" + v for k, v in APP_FOLDER_ENV_VARS))
+    for dep in env_dependencies:
+        results.append("#EnvDep: " + dep.name)
+        results.append("ENV " + dep.name + "=" + quote_env_value(dep.value))
+    # dependency commands have always been run in the app folder
+    results.append("WORKDIR ${APPHOME}")
+    if cache_mounts:
+        # the apt configuration of the official images removes downloaded packages
+        results.append("RUN rm -f /etc/apt/apt.conf.d/docker-clean")
+    return results
+
+
+def generate_soft_dep_instructions(soft_dependencies: List[SoftwareDependency], title, cache_mounts):
+    if not soft_dependencies:
+        return []
+    results = ["\n" + title]
+    run = "RUN "
+    if cache_mounts:
+        run += " ".join(CACHE_MOUNTS) + " "
+    for dep in soft_dependencies:
+        results.append("#SoftDep: " + dep.name)
+        results.append(run + ";".join(dep.commands))
+    return results
+
+
+def generate_syntax_instruction(cache_mounts):
+    # RUN --mount needs the Dockerfile frontend of BuildKit
+    return "# syntax=docker/dockerfile:1" if cache_mounts else []
+
+
+class BaseDockerfile:
+    def __init__(self, base_image, cache_mounts, soft_dependencies, env_dependencies):
+        self.syntax_instruction = generate_syntax_instruction(cache_mounts)
+        self.os_instruction = "FROM " + (base_image or DEFAULT_BASE_IMAGE)
+        self.env_instructions = generate_env_instructions(env_dependencies, cache_mounts)
+        self.soft_dep_instructions = generate_soft_dep_instructions(
+            soft_dependencies, "#Software dependencies", cache_mounts)
+
+    def to_str(self):
+        lines = []
+        for data in (self.syntax_instruction, self.os_instruction, self.env_instructions, self.soft_dep_instructions):
+            lines.extend([data] if isinstance(data, str) else data)
+        return "\n".join(lines) + "\n"
+
+
 class Dockerfile:
-    def __init__(self, pkg_spec: ApplicationSpecification):
+    def __init__(self, pkg_spec: ApplicationSpecification, base_image=None, cache_mounts=False, shared_base_tag=None):
+        self.cache_mounts = cache_mounts
+        self.shared_base_tag = shared_base_tag
+        base_soft_deps, app_soft_deps = split_soft_deps(pkg_spec.dep_specs.soft_deps)
+        env_deps = pkg_spec.dep_specs.env_deps
 
-        self.os_instruction = self.__generate_os()
+        if shared_base_tag is not None:
+            # the dependencies are installed in the shared base image
+            self.base_dockerfile = BaseDockerfile(base_image, cache_mounts, base_soft_deps, env_deps)
+            base_image = shared_base_tag
+            base_soft_deps = []
+        else:
+            self.base_dockerfile = None
+
+        self.syntax_instruction = self.__generate_syntax()
+        self.os_instruction = self.__generate_os(base_image or DEFAULT_BASE_IMAGE)
         self.maintainer_instruction = self.__generate_maintainer(pkg_spec.app_info.publisher)
-        self.app_env_vars_instructions = self.__app_folder_env_vars()
+        self.env_instructions = generate_env_instructions(env_deps, cache_mounts)
+        self.soft_dep_instructions = generate_soft_dep_instructions(
+            base_soft_deps, "#Software dependencies", cache_mounts)
         self.app_data_copy_instructions = self.__copy_app_files_instructions()
-        self.env_dep_instructions = self.__generate_env_deps(pkg_spec.dep_specs.env_deps)
-        self.soft_dep_instructions = self.__generate_soft_deps(pkg_spec.dep_specs.soft_deps)
+        self.app_soft_dep_instructions = generate_soft_dep_instructions(
+            app_soft_deps, "#Software dependencies using application files", cache_mounts)
         self.default_cmd_instructions = self.__generate_default_cmd()
 
-    def __generate_os(self):
-        return "FROM ubuntu:14.04"
+    def __generate_syntax(self):
+        return generate_syntax_instruction(self.cache_mounts)
+
+    def __generate_os(self, base_image):
+        return "FROM " + base_image
 
     def __generate_maintainer(self, publisher_name):
         return 'LABEL maintainer="' + publisher_name + '"'
 
-    def __app_folder_env_vars(self):
-        return [
-            "\n#Application Package Environment Variables",
-            "ENV APPHOME /app",
-            "ENV DEPHOME /dep",
-            "ENV SCHEMAS /schemas",
-            "ENV TESTRUNS /testruns",
-            "ENV INPUT /input"
-        ]
-
     def __copy_app_files_instructions(self):
         return [
             "\n#Copy application files",
@@ -49,27 +170,6 @@ class Dockerfile:
             "RUN chmod -R a+x *"
         ]
 
-    def __generate_env_deps(self, env_dependencies: List[EnvironmentDependency]):
-        results = []
-        for dep in env_dependencies:
-            results.append("#EnvDep: " + dep.name)
-            results.append("ENV " + dep.name + " " + dep.value)
-        return results
-
-    def __generate_soft_deps(self, soft_dependencies: List[SoftwareDependency]):
-        results = ["\n#Software dependencies"]
-        for dep in soft_dependencies:
-            results.append("#SoftDep: " + dep.name)
-            if dep.path:
-                pass
-            cmd_string = "RUN "
-            for cmd in dep.commands[:-1]:
-                cmd_string += cmd
-                cmd_string += ";"
-            cmd_string += dep.commands[-1]
-            results.append(cmd_string)
-        return results
-
     def __generate_default_cmd(self):
         results = [
             "\n#Set workdir and default cmd",
@@ -82,13 +182,17 @@ class Dockerfile:
         try:
             dockerfile_path = os.path.join(path, "Dockerfile")
             with open(dockerfile_path, 'w') as dockerfile:
+                write_instructions_to_dockerfile(self.syntax_instruction, dockerfile)
                 write_instructions_to_dockerfile(self.os_instruction, dockerfile)
                 write_instructions_to_dockerfile(self.maintainer_instruction, dockerfile)
-                write_instructions_to_dockerfile(self.app_env_vars_instructions, dockerfile)
-                write_instructions_to_dockerfile(self.app_data_copy_instructions, dockerfile)
-                write_instructions_to_dockerfile(self.env_dep_instructions, dockerfile)
+                write_instructions_to_dockerfile(self.env_instructions, dockerfile)
                 write_instructions_to_dockerfile(self.soft_dep_instructions, dockerfile)
+                write_instructions_to_dockerfile(self.app_data_copy_instructions, dockerfile)
+                write_instructions_to_dockerfile(self.app_soft_dep_instructions, dockerfile)
                 write_instructions_to_dockerfile(self.default_cmd_instructions, dockerfile)
+            if self.base_dockerfile is not None:
+                with open(os.path.join(path, BASE_DOCKERFILE_NAME), 'w') as dockerfile:
+                    dockerfile.write(self.base_dockerfile.to_str())
         except Exception as e:
             # TODO: exception handling
             print("error while saving dockerfile", e)
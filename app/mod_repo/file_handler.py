@@ -1,39 +1,140 @@
 from config import BASE_DIR
+from flask import current_app
+from app.mod_repo import blob_store
 import uuid
 import requests
-import mimetypes
 import os
-from pyunpack import Archive
-import glob
+import io
+import hashlib
+import tarfile
+import tempfile
+import zipfile
 import shutil
 
 
-def get_app_archive_from_url(app_name, url_string) -> str:
+def fetch_app_archive(app_name, url_string):
+    temp_name = generate_temp_folder_name(app_name)
+    root_temp_folder = get_temp_app_directory_path()
+    temp_app_folder = os.path.join(root_temp_folder, temp_name)
+    create_folder_if_not_exists(temp_app_folder)
+
     try:
-        temp_name = generate_temp_folder_name(app_name)
-        root_temp_folder = get_temp_app_directory_path()
-        temp_app_folder = os.path.join(root_temp_folder, temp_name)
-        create_folder_if_not_exists(temp_app_folder)
+        # a stalled server fails the download instead of blocking the worker
+        with requests.get(url_string, stream=True, timeout=current_app.config["ARCHIVE_DOWNLOAD_TIMEOUT"]) as response:
+            response.raise_for_status()
+            archive_info = stream_extract_archive(response, temp_app_folder)
+    except Exception:
+        remove_dir_tree(temp_app_folder)
+        raise
+
+    return temp_app_folder, archive_info
+
+
+class ArchiveError(Exception):
+    def __init__(self, msg):
+        self.msg = msg
+
+    def __str__(self):
+        return self.msg
+
+
+class HashingReader(io.RawIOBase):
+    # hashes and counts the bytes of the wrapped stream while they are read and
+    # stops the download as soon as the size limit is exceeded
+    def __init__(self, stream, max_size):
+        self.stream = stream
+        self.max_size = max_size
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self.stream.read(len(b))
+        n = len(data)
+        self.size += n
+        if self.max_size and self.size > self.max_size:
+            raise ArchiveError("archive exceeds the maximum size of " + str(self.max_size) + " bytes")
+        self.sha256.update(data)
+        b[:n] = data
+        return n
+
+
+def stream_extract_archive(response, destination, max_size=None, max_files=None, max_extracted_size=None):
+    config = current_app.config
+    max_size = max_size or config["ARCHIVE_MAX_SIZE"]
+    max_files = max_files or config["ARCHIVE_MAX_FILES"]
+    max_extracted_size = max_extracted_size or config["ARCHIVE_MAX_EXTRACTED_SIZE"]
+    chunk_size = config["ARCHIVE_CHUNK_SIZE"]
+
+    response.raw.decode_content = True
+    reader = HashingReader(response.raw, max_size)
+    buffered = io.BufferedReader(reader, buffer_size=chunk_size)
+
+    if buffered.peek(4)[:4] == b"PK\x03\x04":
+        # zip archives keep their directory at the end and need a seekable file
+        with tempfile.SpooledTemporaryFile(max_size=config["ARCHIVE_SPOOL_SIZE"]) as spool:
+            shutil.copyfileobj(buffered, spool, chunk_size)
+            files_count = extract_zip(spool, destination, max_files, max_extracted_size)
+    else:
+        with tarfile.open(fileobj=buffered, mode="r|*", bufsize=chunk_size) as tar:
+            files_count = extract_tar_stream(tar, destination, max_files, max_extracted_size)
+        # drain the trailing padding so that the digest covers the whole archive
+        while buffered.read(chunk_size):
+            pass
+
+    return {"sha256": reader.sha256.hexdigest(), "size": reader.size, "files": files_count}
+
+
+def get_safe_member_path(destination, name):
+    root = os.path.realpath(destination)
+    path = os.path.realpath(os.path.join(root, name))
+    if path != root and not path.startswith(root + os.sep):
+        raise ArchiveError("archive member " + name + " points outside of the destination folder")
+    return path
+
+
+def extract_tar_stream(tar, destination, max_files, max_extracted_size):
+    files_count = 0
+    extracted_size = 0
+    for member in tar:
+        get_safe_member_path(destination, member.name)
+        if member.issym():
+            get_safe_member_path(destination, os.path.join(os.path.dirname(member.name), member.linkname))
+        elif member.islnk():
+            get_safe_member_path(destination, member.linkname)
+        elif not (member.isfile() or member.isdir()):
+            # devices and fifos are never part of an application package
+            continue
+
+        if member.isfile():
+            files_count += 1
+            extracted_size += member.size
+            if files_count > max_files:
+                raise ArchiveError("archive contains more than " + str(max_files) + " files")
+            if extracted_size > max_extracted_size:
+                raise ArchiveError("archive expands to more than " + str(max_extracted_size) + " bytes")
+
+        tar.extract(member, destination)
 
-        response = requests.get(url_string, stream=True)
-        content_type = response.headers['content-type']
-        extension = mimetypes.guess_extension(content_type)
-        temp_file = "archive" + extension
-        temp_path = os.path.join(temp_app_folder, temp_file)
+    return files_count
 
-        with open(temp_path, 'wb') as f:
-            for chunk in response:
-                f.write(chunk)
 
-        Archive(temp_path).extractall(temp_app_folder)
-        os.remove(temp_path)
+def extract_zip(fileobj, destination, max_files, max_extracted_size):
+    with zipfile.ZipFile(fileobj) as archive:
+        members = archive.infolist()
+        files = [m for m in members if not m.filename.endswith("/")]
+        if len(files) > max_files:
+            raise ArchiveError("archive contains more than " + str(max_files) + " files")
+        if sum(m.file_size for m in files) > max_extracted_size:
+            raise ArchiveError("archive expands to more than " + str(max_extracted_size) + " bytes")
 
-        return temp_app_folder
+        for m in members:
+            get_safe_member_path(destination, m.filename)
+            archive.extract(m, destination)
 
-    except Exception as e:
-        print(e)
-        # TODO: handle exceptions
-        pass
+    return len(files)
 
 
 def generate_temp_id():
@@ -66,30 +167,40 @@ def generate_temp_folder_name(app_name):
 
 
 def store_app_files(temp_app_path, app_id):
+    # files are moved into the content-addressed blob store and linked into the
+    # app's folder, the provisioning package is streamed on demand from there
     apps_folder = get_pub_app_directory_path()
     destination_folder = os.path.join(apps_folder, app_id)
-    recursive_copy_files(temp_app_path, destination_folder)
-    shutil.make_archive(os.path.join(destination_folder, "prov-pkg"), 'gztar', temp_app_path)
+    with blob_store.storing():
+        create_folder_if_not_exists(destination_folder)
+        try:
+            manifest, stats = blob_store.store_tree(temp_app_path, destination_folder,
+                                                    workers=current_app.config["FILE_TRANSFER_WORKERS"])
+        except Exception:
+            # a folder without manifest would keep the blobs from being collected
+            shutil.rmtree(destination_folder, ignore_errors=True)
+            raise
     remove_dir_tree(temp_app_path)
 
-    return destination_folder
+    return destination_folder, stats.to_dict()
 
 
-def recursive_copy_files(source_path, destination_path, override=False):
-    files_count = 0
-    if not os.path.exists(destination_path):
-        os.mkdir(destination_path)
-    items = glob.glob(source_path + '/*')
-    for item in items:
-        if os.path.isdir(item):
-            path = os.path.join(destination_path, item.split('/')[-1])
-            files_count += recursive_copy_files(source_path=item, destination_path=path, override=override)
-        else:
-            file = os.path.join(destination_path, item.split('/')[-1])
-            if not os.path.exists(file) or override:
-                shutil.copyfile(item, file)
-                files_count += 1
-    return files_count
+def stream_app_package(app_path):
+    return blob_store.stream_package(app_path)
+
+
+def remove_app_files(app_path):
+    return remove_apps_files([app_path])
+
+
+def remove_apps_files(app_paths):
+    # drops the apps' links and manifests and then every blob no other app refers to
+    for app_path in app_paths:
+        if app_path and os.path.exists(app_path):
+            remove_dir_tree(app_path)
+        if app_path:
+            blob_store.remove_manifest(app_path)
+    return blob_store.collect_garbage(get_pub_app_directory_path())
 
 
 def remove_dir_tree(app_path):
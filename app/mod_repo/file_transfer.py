@@ -0,0 +1,100 @@
+import errno
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# File helpers of the blob store. Files are processed by a pool of threads,
+# which overlaps the I/O of many small files, and a file that has to be copied
+# across devices is copied in the kernel (copy_file_range/sendfile).
+
+DEFAULT_WORKERS = 8
+COPY_CHUNK_SIZE = 8 * 1024 ** 2
+
+
+class TransferStats:
+    __slots__ = ("files", "bytes", "moved", "copied", "deduplicated", "started", "duration", "lock")
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.moved = 0
+        self.copied = 0
+        self.deduplicated = 0
+        self.started = time.perf_counter()
+        self.duration = None
+        self.lock = threading.Lock()
+
+    def add(self, size, method):
+        with self.lock:
+            self.files += 1
+            self.bytes += size
+            if method == "moved":
+                self.moved += 1
+            elif method == "copied":
+                self.copied += 1
+            elif method == "deduplicated":
+                self.deduplicated += 1
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+        return self
+
+    def to_dict(self):
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "moved": self.moved,
+            "copied": self.copied,
+            "deduplicated": self.deduplicated,
+            "duration": self.duration
+        }
+
+
+def _kernel_copy(src, dst, size):
+    copy_file_range = getattr(os, "copy_file_range", None)
+    offset = 0
+    while offset < size:
+        if copy_file_range is not None:
+            sent = copy_file_range(src.fileno(), dst.fileno(), min(COPY_CHUNK_SIZE, size - offset))
+        else:
+            sent = os.sendfile(dst.fileno(), src.fileno(), offset, min(COPY_CHUNK_SIZE, size - offset))
+        if sent == 0:
+            break
+        offset += sent
+
+    return offset
+
+
+def copy_file(source_path, destination_path):
+    size = os.path.getsize(source_path)
+    with open(source_path, 'rb') as src, open(destination_path, 'wb') as dst:
+        try:
+            copied = _kernel_copy(src, dst, size)
+        except OSError as e:
+            # not supported for these file systems, copy through user space
+            if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.EXDEV, errno.EOPNOTSUPP, errno.EBADF):
+                raise
+            copied = None
+        if copied is None or copied < size:
+            src.seek(0)
+            dst.seek(0)
+            dst.truncate()
+            shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+    shutil.copymode(source_path, destination_path)
+
+    return size
+
+
+def list_tree(source_path):
+    # unlike glob('*') this includes dotfiles
+    for root, dirs, names in os.walk(source_path):
+        for name in names:
+            yield os.path.relpath(os.path.join(root, name), source_path)
+
+
+def map_files(action, paths, workers=None):
+    with ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS) as executor:
+        # list() re-raises the first error of any worker
+        return list(executor.map(action, paths))
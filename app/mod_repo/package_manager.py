@@ -1,7 +1,10 @@
+import hashlib
 import json
 import os
+from flask import current_app
 from app.mod_repo.models import *
-from app.mod_repo.dockerfile_generator import Dockerfile
+from app.mod_repo import blob_store, file_transfer
+from app.mod_repo.dockerfile_generator import Dockerfile, base_image_fingerprint, generate_base_image_tag
 
 
 def read_package_specification(temp_app_dir):
@@ -23,13 +26,50 @@ def deserialize_package_specification(temp_app_dir):
         obj = dict_to_app_pkg_spec_object(data)
 
         return obj
+    except SpecValidationError:
+        raise
     except Exception as e:
         print(e)
 
 
+def compute_package_hash(temp_app_dir) -> str:
+    # hash of the parsed specification and of every other file of the package,
+    # reformatting app-spec.json or repacking the archive does not change it
+    spec = read_package_specification(temp_app_dir)
+    rel_paths = sorted(p for p in file_transfer.list_tree(temp_app_dir) if p != "app-spec.json")
+
+    def hash_file(rel_path):
+        path = os.path.join(temp_app_dir, rel_path)
+        executable = os.access(path, os.X_OK)
+        return rel_path.replace(os.sep, "/"), blob_store.hash_file(path), executable
+
+    files = file_transfer.map_files(hash_file, rel_paths, current_app.config["FILE_TRANSFER_WORKERS"])
+    data = json.dumps({"spec": spec, "files": files}, sort_keys=True, separators=(",", ":"))
+
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def get_shared_base_image(pkg_spec: ApplicationSpecification):
+    # None if shared base images are disabled or there is nothing to install
+    if not current_app.config["DOCKER_SHARED_BASE_IMAGES"]:
+        return None
+    fingerprint = base_image_fingerprint(pkg_spec, current_app.config["DOCKER_BASE_IMAGE"])
+    if fingerprint is None:
+        return None
+
+    return {
+        "fingerprint": fingerprint,
+        "tag": generate_base_image_tag(current_app.config["DOCKER_IMAGES_TAG_PREFIX"], fingerprint)
+    }
+
+
 def generate_dockerfile(pkg_spec: ApplicationSpecification, path) -> bool:
     try:
-        d = Dockerfile(pkg_spec)
+        shared_base = get_shared_base_image(pkg_spec)
+        d = Dockerfile(pkg_spec,
+                       base_image=current_app.config["DOCKER_BASE_IMAGE"],
+                       cache_mounts=current_app.config["DOCKER_BUILDKIT"],
+                       shared_base_tag=shared_base["tag"] if shared_base else None)
         d.save(path)
 
         return True
@@ -0,0 +1,224 @@
+import time
+import traceback
+from datetime import datetime
+import celery
+from flask import current_app
+from pymongo.errors import DuplicateKeyError
+from app.mod_repo import package_manager, file_handler, db_handler
+from app.mod_repo.models import SpecValidationError
+from app.mod_tm import deployer
+
+# Publishing runs as a chain of Celery tasks, fetch -> validate -> build ->
+# store. Every stage receives and returns the job's context dict and
+# records its state and timing in the job document, so GET /publish-jobs/<id>
+# reports the progress while the API thread is already free again.
+
+STAGES = ["fetch", "validate", "build", "store"]
+
+
+class StageFailed(Exception):
+    def __init__(self, msg, details=None):
+        self.msg = msg
+        self.details = details
+
+
+def start_publish(request_body) -> str:
+    job_id = db_handler.create_publish_job(request_body, STAGES)
+    priority = request_body.get("priority", current_app.config["PUBLISH_DEFAULT_PRIORITY"])
+    ctx = {
+        "jobID": job_id,
+        "name": request_body["name"],
+        "archiveURL": request_body["archiveURL"],
+        "deploy": request_body.get("deploy", False) is True,
+        "buildID": None
+    }
+    if ctx["deploy"]:
+        # queryable (and cancellable) from now on, not only once a build worker picks it up
+        ctx["buildID"] = db_handler.create_build(None, priority, job_id)
+        db_handler.update_publish_job(job_id, {"buildID": ctx["buildID"]})
+
+    # all stages run with the job's priority, so a high priority publish also
+    # passes the queued fetch/validate/store work of others
+    pipeline = celery.chain(
+        fetch_app_archive.s(ctx).set(priority=priority),
+        validate_app_package.s().set(priority=priority),
+        build_app_image.s().set(queue=current_app.config["PUBLISH_BUILD_QUEUE"], priority=priority,
+                                soft_time_limit=current_app.config["DOCKER_BUILD_TIMEOUT"] + 60),
+        store_app_package.s().set(priority=priority)
+    )
+    pipeline.apply_async()
+
+    return job_id
+
+
+def run_stage(stage, ctx, action):
+    job_id = ctx["jobID"]
+    if ctx.get("deduplicated"):
+        # an identical version is published already, the remaining stages have nothing to do
+        db_handler.update_publish_stage(job_id, stage, {"state": "SKIPPED"},
+                                        job_state="SUCCESS" if stage == STAGES[-1] else "PROGRESS")
+        return ctx
+
+    db_handler.update_publish_stage(job_id, stage, {"state": "STARTED", "startedAt": datetime.utcnow()})
+    start = time.perf_counter()
+    try:
+        ctx = action(ctx)
+    except Exception as e:
+        if isinstance(e, StageFailed):
+            error = {"message": e.msg, "details": e.details}
+        else:
+            print(traceback.format_exc())
+            error = {"message": str(e), "details": None}
+        db_handler.update_publish_stage(job_id, stage, {
+            "state": "FAILURE",
+            "finishedAt": datetime.utcnow(),
+            "duration": time.perf_counter() - start
+        }, job_state="FAILURE", error=error)
+        if ctx.get("tempPath"):
+            file_handler.remove_dir_tree(ctx["tempPath"])
+        if ctx.get("buildID") and STAGES.index(stage) < STAGES.index("build"):
+            db_handler.finish_build(ctx["buildID"], "CANCELLED", {"error": "publishing failed in the " + stage + " stage"})
+        raise
+
+    db_handler.update_publish_stage(job_id, stage, {
+        "state": "SUCCESS",
+        "finishedAt": datetime.utcnow(),
+        "duration": time.perf_counter() - start
+    }, job_state="SUCCESS" if stage == STAGES[-1] else "PROGRESS")
+
+    return ctx
+
+
+def is_published(ctx, existing) -> bool:
+    # True if the same content is published under the app's ID, the job then
+    # reports the existing app and image instead of building and storing again
+    if existing is None:
+        return False
+    if existing["appInfo"].get("packageHash") != ctx["packageHash"]:
+        raise StageFailed("a different package is already published under this app ID", ctx["appID"])
+    pkg_ids = [p["pkgID"] for p in existing["appInfo"].get("providers", []) if p.get("pkgID")]
+    if ctx["deploy"] and not pkg_ids:
+        raise StageFailed("the app is already published without an image, delete it to publish with deploy",
+                          ctx["appID"])
+
+    ctx["deduplicated"] = True
+    if ctx.get("buildID"):
+        db_handler.finish_build(ctx["buildID"], "SKIPPED", {})
+    db_handler.update_publish_job(ctx["jobID"], {"deduplicated": True, "pkgID": pkg_ids[0] if pkg_ids else None})
+    return True
+
+
+def load_package(ctx):
+    return package_manager.deserialize_package_specification(ctx["tempPath"])
+
+
+@celery.task
+def fetch_app_archive(ctx):
+    def fetch(ctx):
+        try:
+            temp_app_path, archive_info = file_handler.fetch_app_archive(ctx["name"], ctx["archiveURL"])
+        except Exception as e:
+            raise StageFailed("archive could not be downloaded or extracted", str(e))
+        ctx["tempPath"] = temp_app_path
+        ctx["archive"] = archive_info
+        return ctx
+
+    return run_stage("fetch", ctx, fetch)
+
+
+@celery.task
+def validate_app_package(ctx):
+    def validate(ctx):
+        try:
+            pkg_spec = load_package(ctx)
+        except SpecValidationError as e:
+            raise StageFailed("invalid package specification", e.violations)
+        if pkg_spec is None:
+            raise StageFailed("package specification could not be read")
+        ctx["appID"] = pkg_spec.app_info.id
+        db_handler.set_publish_job_app(ctx["jobID"], ctx["appID"])
+
+        # computed before the Dockerfile is added to the package
+        ctx["packageHash"] = package_manager.compute_package_hash(ctx["tempPath"])
+        if is_published(ctx, db_handler.find_published_version(ctx["appID"])):
+            file_handler.remove_dir_tree(ctx.pop("tempPath"))
+            return ctx
+
+        if not package_manager.generate_dockerfile(pkg_spec, ctx["tempPath"]):
+            raise StageFailed("Dockerfile could not be generated")
+        ctx["baseImage"] = package_manager.get_shared_base_image(pkg_spec)
+        return ctx
+
+    return run_stage("validate", ctx, validate)
+
+
+@celery.task
+def build_app_image(ctx):
+    def build(ctx):
+        ctx["providers"] = []
+        if ctx["deploy"]:
+            pkg_spec = load_package(ctx)
+            tag = deployer.generate_image_tag(pkg_spec.app_info.name, pkg_spec.app_info.version)
+            base_tag = ctx["baseImage"]["tag"] if ctx["baseImage"] else None
+            try:
+                provider = deployer.deploy_app(ctx["tempPath"], tag, base_tag=base_tag, build_id=ctx["buildID"])
+            except deployer.BuildError as e:
+                raise StageFailed("image build " + e.state.lower() + ": " + e.msg, e.log[-20:] if e.log else None)
+            metrics = provider.pop("buildMetrics")
+            if metrics["baseImage"] is not None:
+                ctx["baseImage"]["imageID"] = metrics["baseImage"]["imageID"]
+            db_handler.update_publish_stage(ctx["jobID"], "build", {"metrics": metrics})
+            ctx["providers"].append(provider)
+        return ctx
+
+    return run_stage("build", ctx, build)
+
+
+@celery.task
+def store_app_package(ctx):
+    def store(ctx):
+        pkg_spec = load_package(ctx)
+        pkg_spec.app_info.package_hash = ctx["packageHash"]
+        pkg_spec.app_info.providers.extend(ctx["providers"])
+        for t in pkg_spec.t_specs:
+            t.providers.extend(ctx["providers"])
+
+        # a publish of the app that finished while this one was building owns the
+        # app's folder, its files must not be overwritten
+        if is_published(ctx, db_handler.find_published_version(ctx["appID"])):
+            file_handler.remove_dir_tree(ctx.pop("tempPath"))
+            return ctx
+
+        try:
+            pkg_spec.app_info.path, transfer = file_handler.store_app_files(ctx["tempPath"], pkg_spec.app_info.id)
+        except Exception as e:
+            raise StageFailed("file system storage error", str(e))
+        ctx.pop("tempPath")
+        db_handler.update_publish_stage(ctx["jobID"], "store", {"files": transfer})
+
+        try:
+            db_handler.store_app(pkg_spec)
+        except Exception as e:
+            existing = db_handler.find_published_version(ctx["appID"])
+            if existing is None:
+                # nothing refers to the stored files, e.g. after a qname conflict with another app
+                file_handler.remove_app_files(pkg_spec.app_info.path)
+            elif isinstance(e, DuplicateKeyError) and is_published(ctx, existing):
+                # a concurrent publish of identical content won the race, the
+                # files just stored are the same as its own
+                return ctx
+            raise StageFailed("DB storage error", str(e))
+
+        if ctx["providers"]:
+            db_handler.update_publish_job(ctx["jobID"], {"pkgID": ctx["providers"][0]["pkgID"]})
+        try:
+            # only an app whose image was built FROM the base image shares it
+            if ctx["deploy"] and ctx["baseImage"] and ctx["baseImage"].get("imageID"):
+                db_handler.register_base_image(ctx["baseImage"]["fingerprint"], ctx["baseImage"]["tag"],
+                                               ctx["appID"], ctx["baseImage"].get("imageID"))
+        except Exception as e:
+            raise StageFailed("DB storage error", str(e))
+        return ctx
+
+    return run_stage("store", ctx, store)
+
@@ -0,0 +1,214 @@
+import hashlib
+from itertools import combinations
+from typing import List
+
+# Structured counterpart of the transformation signatures. Every transformation
+# document carries a "signatureIndex" sub-document with numeric parameter counts
+# and per-format input/output counts, so that partial matches (subset/superset
+# of inputs, parameter ranges) can be answered with one indexed query. The index
+# is written together with the transformation when its app is stored.
+
+FIELD = "signatureIndex"
+INPUT_FILE = "fi"
+INPUT_FILESET = "fsi"
+
+MATCH_SUBSET = "subset"
+MATCH_SUPERSET = "superset"
+MATCH_MODES = [MATCH_SUBSET, MATCH_SUPERSET]
+
+# subset queries look up the keys of all subsets of the provided input formats,
+# above this many formats they fall back to a scan of the collection
+MAX_SUBSET_FORMATS = 8
+
+
+def normalize_format(fmt: str) -> str:
+    return fmt.strip().lower()
+
+
+def input_key(kind, fmt):
+    return kind + ":" + normalize_format(fmt)
+
+
+def required_inputs_key(formats) -> str:
+    # equal sets of required input formats have equal keys
+    return "|".join(sorted(formats))
+
+
+def count_by_format(formats: List[str]) -> dict:
+    counts = {}
+    for f in formats:
+        f = normalize_format(f)
+        counts[f] = counts.get(f, 0) + 1
+    return counts
+
+
+def encode_signature(pnum: int, infiles: dict, infilesets: dict, outfiles: dict) -> str:
+    # canonical textual form: formats are normalized and sorted and zero counts
+    # are left out, so publish and query time produce the same bytes
+    signature = "[pi:" + str(pnum) + "]"
+    for prefix, counts in (("fi", infiles), ("fsi", infilesets), ("fo", outfiles)):
+        for f in sorted(counts):
+            if counts[f] > 0:
+                signature += "[" + prefix + ":" + str(counts[f]) + ":" + f + "]"
+    return signature
+
+
+def signature_digest(signature: str) -> str:
+    return hashlib.sha256(signature.encode("utf-8")).hexdigest()
+
+
+def signatures_from_dict(t_dict) -> tuple:
+    # (strict, relaxed) signatures of a stored transformation document
+    params = t_dict.get("inputParams", [])
+    relaxed_pnum = len([p for p in params if not p.get("isOptional", True)])
+
+    counts = {"strict": [{}, {}], "relaxed": [{}, {}]}
+    for pos, prop in enumerate(("inputFiles", "inputFileSets")):
+        for i in t_dict.get(prop, []):
+            f = normalize_format(i["format"])
+            counts["strict"][pos][f] = counts["strict"][pos].get(f, 0) + 1
+            if not i.get("isOptional", True):
+                counts["relaxed"][pos][f] = counts["relaxed"][pos].get(f, 0) + 1
+
+    outfiles = count_by_format([o["format"] for o in t_dict.get("outputFiles", [])])
+
+    strict = encode_signature(len(params), counts["strict"][0], counts["strict"][1], outfiles)
+    relaxed = encode_signature(relaxed_pnum, counts["relaxed"][0], counts["relaxed"][1], outfiles)
+
+    return strict, relaxed
+
+
+def build(t_dict) -> dict:
+    params = t_dict.get("inputParams", [])
+    params_required = len([p for p in params if not p.get("isOptional", True)])
+
+    inputs = {}
+    for kind, prop in ((INPUT_FILE, "inputFiles"), (INPUT_FILESET, "inputFileSets")):
+        for i in t_dict.get(prop, []):
+            key = input_key(kind, i["format"])
+            if key not in inputs:
+                inputs[key] = {"key": key, "required": 0, "total": 0}
+            inputs[key]["total"] += 1
+            if not i.get("isOptional", True):
+                inputs[key]["required"] += 1
+
+    outputs = {}
+    for o in t_dict.get("outputFiles", []):
+        f = normalize_format(o["format"])
+        outputs[f] = outputs.get(f, 0) + 1
+
+    return {
+        "paramsRequired": params_required,
+        "paramsTotal": len(params),
+        "inputs": [inputs[k] for k in sorted(inputs)],
+        "inputFormats": sorted(inputs),
+        "requiredInputFormats": sorted(k for k in inputs if inputs[k]["required"] > 0),
+        "requiredInputsKey": required_inputs_key(k for k in inputs if inputs[k]["required"] > 0),
+        "outputs": [{"format": f, "count": outputs[f]} for f in sorted(outputs)],
+        "outputFormats": sorted(outputs)
+    }
+
+
+def count_inputs(kind, formats: List[str]) -> dict:
+    counts = {}
+    for f in formats:
+        key = input_key(kind, f)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+class SignatureQuery:
+    def __init__(self, match, pnum=None, pmin=None, pmax=None, infiles=None, infilesets=None, outfiles=None):
+        if match not in MATCH_MODES:
+            raise ValueError("unknown match mode " + str(match))
+
+        self.match = match
+        self.pnum = pnum
+        self.pmin = pmin
+        self.pmax = pmax
+        self.inputs = count_inputs(INPUT_FILE, infiles or [])
+        self.inputs.update(count_inputs(INPUT_FILESET, infilesets or []))
+        self.outputs = count_by_format(outfiles or [])
+
+    def to_mongo_query(self) -> dict:
+        query = {}
+
+        # pnum: the caller supplies exactly pnum parameters
+        # pmin/pmax: range of the number of parameters the transformation declares
+        params_total = {}
+        if self.pnum is not None:
+            query[FIELD + ".paramsRequired"] = {"$lte": self.pnum}
+            params_total["$gte"] = self.pnum
+        if self.pmin is not None:
+            params_total["$gte"] = max(self.pmin, params_total.get("$gte", self.pmin))
+        if self.pmax is not None:
+            params_total["$lte"] = self.pmax
+        if len(params_total) > 0:
+            query[FIELD + ".paramsTotal"] = params_total
+
+        if self.match == MATCH_SUBSET:
+            # every input the transformation requires must be among the provided ones
+            unindexed = {FIELD + ".requiredInputFormats": {"$not": {"$elemMatch": {"$nin": sorted(self.inputs)}}}}
+            if len(self.inputs) <= MAX_SUBSET_FORMATS:
+                # the required formats form one of the subsets of the provided ones;
+                # documents indexed before the key existed are matched as before
+                query["$or"] = [
+                    {FIELD + ".requiredInputsKey": {"$in": self.subset_keys()}},
+                    dict(unindexed, **{FIELD + ".requiredInputsKey": None})
+                ]
+            else:
+                query.update(unindexed)
+        elif len(self.inputs) > 0:
+            # the transformation must accept all of the provided inputs
+            query[FIELD + ".inputFormats"] = {"$all": sorted(self.inputs)}
+
+        if len(self.outputs) > 0:
+            query[FIELD + ".outputFormats"] = {"$all": sorted(self.outputs)}
+
+        return query
+
+    def subset_keys(self) -> List[str]:
+        formats = sorted(self.inputs)
+        return [required_inputs_key(c) for n in range(len(formats) + 1) for c in combinations(formats, n)]
+
+    def accepts(self, index) -> bool:
+        # per-format counts are checked here, the database query has already
+        # narrowed the candidates down by format
+        inputs = {i["key"]: i for i in index["inputs"]}
+        if self.match == MATCH_SUBSET:
+            for key, i in inputs.items():
+                if i["required"] > self.inputs.get(key, 0):
+                    return False
+        else:
+            for key, count in self.inputs.items():
+                if key not in inputs or inputs[key]["total"] < count:
+                    return False
+
+        outputs = {o["format"]: o["count"] for o in index["outputs"]}
+        for fmt, count in self.outputs.items():
+            if outputs.get(fmt, 0) < count:
+                return False
+
+        return True
+
+    def distance(self, index) -> int:
+        # closeness of fit: the number of parameters, inputs and outputs that
+        # differ between the query and the transformation
+        d = 0
+        if self.pnum is not None:
+            d += index["paramsTotal"] - self.pnum
+
+        inputs = {i["key"]: i["total"] for i in index["inputs"]}
+        for key in set(inputs) | set(self.inputs):
+            d += abs(inputs.get(key, 0) - self.inputs.get(key, 0))
+
+        outputs = {o["format"]: o["count"] for o in index["outputs"]}
+        for fmt in set(outputs) | set(self.outputs):
+            d += abs(outputs.get(fmt, 0) - self.outputs.get(fmt, 0))
+
+        return d
+
+    def rank(self, t_docs) -> list:
+        matches = [t for t in t_docs if self.accepts(t[FIELD])]
+        matches.sort(key=lambda t: self.distance(t[FIELD]))
+        return matches
@@ -0,0 +1,228 @@
+# Declarative schema of app-spec.json. The schema is turned once at import time
+# into one check function per entity, so a whole specification is validated in a
+# single pass and every violation is reported together with its JSON path.
+
+STRING = "string"
+NON_EMPTY_LIST = "list"
+OBJECT = "object"
+
+# entity: {
+#     "name": prefix of the property names in messages,
+#     "required": {key: type},
+#     "children": {key: (entity, is_list)},
+#     "non_empty": {group name: [keys of which at least one list must be non-empty]}
+# }
+SCHEMA = {
+    "spec": {
+        "name": "spec",
+        "required": {"appInfo": OBJECT},
+        "children": {
+            "appInfo": ("appInfo", False),
+            "transformations": ("transformation", True),
+            "dependencies": ("dependencies", False),
+            "configs": ("config", True),
+            "invocations": ("invocations", False),
+            "testRuns": ("testrun", True)
+        }
+    },
+    "appInfo": {
+        "name": "appInfo",
+        "required": {"appName": STRING, "appDevelopers": NON_EMPTY_LIST, "appPublisher": STRING, "appVersion": STRING}
+    },
+    "transformation": {
+        "name": "transformation",
+        "required": {"name": STRING},
+        "children": {
+            "inputParams": ("inputParam", True),
+            "inputFiles": ("inputFile", True),
+            "inputFileSets": ("inputFileSet", True),
+            "outputFiles": ("outputFile", True)
+        },
+        "non_empty": {"inputs": ["inputParams", "inputFiles", "inputFileSets"], "outputs": ["outputFiles"]}
+    },
+    "inputParam": {
+        "name": "inputParam",
+        "required": {"inputName": STRING, "alias": STRING, "type": STRING}
+    },
+    "inputFile": {
+        "name": "inputFile",
+        "required": {"inputName": STRING, "alias": STRING, "format": STRING}
+    },
+    "inputFileSet": {
+        "name": "inputFileSet",
+        "required": {"inputName": STRING, "alias": STRING, "format": STRING, "requiredPath": STRING}
+    },
+    "outputFile": {
+        "name": "outputFile",
+        "required": {"outputName": STRING, "alias": STRING, "format": STRING, "accessPath": STRING}
+    },
+    "dependencies": {
+        "name": "dependencies",
+        "children": {
+            "envDeps": ("envDep", True),
+            "softDeps": ("softDep", True),
+            "fileDeps": ("fileDep", True)
+        }
+    },
+    "envDep": {
+        "name": "envDep",
+        "required": {"depName": STRING, "alias": STRING, "value": STRING}
+    },
+    "softDep": {
+        "name": "softDep",
+        "required": {"depName": STRING, "alias": STRING, "commands": NON_EMPTY_LIST}
+    },
+    "fileDep": {
+        "name": "fileDep",
+        "required": {"depName": STRING, "alias": STRING, "filePath": STRING}
+    },
+    "config": {
+        "name": "config",
+        "required": {"commands": NON_EMPTY_LIST}
+    },
+    "invocations": {
+        "name": "invocations",
+        "children": {"invocationsCLI": ("invocation", True)}
+    },
+    "invocation": {
+        "name": "invocation",
+        "required": {"invName": STRING, "command": STRING}
+    },
+    "testrun": {
+        "name": "testrun",
+        "required": {"name": STRING, "transformation": STRING},
+        "children": {
+            "sampleInputParams": ("sampleInputParam", True),
+            "sampleInputFiles": ("sampleInputFile", True),
+            "sampleInputFileSets": ("sampleInputFileSet", True),
+            "resultingOutputFiles": ("sampleOutputFile", True)
+        },
+        "non_empty": {
+            "inputs": ["sampleInputParams", "sampleInputFiles", "sampleInputFileSets"],
+            "outputs": ["resultingOutputFiles"]
+        }
+    },
+    "sampleInputParam": {
+        "name": "sampleInputParam",
+        "required": {"alias": STRING, "value": STRING}
+    },
+    "sampleInputFile": {
+        "name": "sampleInputFile",
+        "required": {"alias": STRING, "accessPath": STRING}
+    },
+    "sampleInputFileSet": {
+        "name": "sampleInputFileSet",
+        "required": {"alias": STRING, "accessPath": STRING}
+    },
+    "sampleOutputFile": {
+        "name": "sampleOutputFile",
+        "required": {"alias": STRING, "outputPath": STRING}
+    }
+}
+
+TYPES = {STRING: str, NON_EMPTY_LIST: list, OBJECT: dict}
+
+
+def violation(path, prop, message):
+    return {"path": path, "property": prop, "message": message}
+
+
+def missing(path, prop):
+    return violation(path, prop, "Property " + prop + " is missing")
+
+
+def empty(path, prop):
+    return violation(path, prop, "Error when creating property " + prop + ", the value cannot be empty")
+
+
+def wrong_type(path, prop, kind):
+    return violation(path, prop, "Property " + prop + " must be of type " + kind)
+
+
+def format_path(path) -> str:
+    # paths are kept as (parent, key, index) chains while validating and only
+    # rendered as strings for the properties that are actually reported
+    parts = []
+    while path is not None and path[1] is not None:
+        path, key, index = path
+        parts.append("." + key + ("[" + str(index) + "]" if index is not None else ""))
+    return "$" + "".join(reversed(parts))
+
+
+def _report_required(obj, path, key, kind, prop, violations):
+    field_path = format_path((path, key, None))
+    if key not in obj:
+        violations.append(missing(field_path, prop))
+    elif not isinstance(obj[key], TYPES[kind]):
+        violations.append(wrong_type(field_path, prop, kind))
+    else:
+        violations.append(empty(field_path, prop))
+
+
+def _build_check(entity, checks):
+    # check function of one entity, the rules of its schema entry are resolved
+    # into plain tuples once so that validating only loops over them
+    definition = SCHEMA[entity]
+    name = definition["name"]
+    required = [(key, TYPES[kind], kind, kind == STRING, name + "." + key)
+                for key, kind in definition.get("required", {}).items()]
+    non_empty = [(name + "." + group, keys) for group, keys in definition.get("non_empty", {}).items()]
+    children = [(key, child, is_list, name + "." + key)
+                for key, (child, is_list) in definition.get("children", {}).items()]
+
+    def check(obj, parent, at, index, violations):
+        if type(obj) is not dict:
+            violations.append(wrong_type(format_path((parent, at, index)), name, OBJECT))
+            return
+
+        get = obj.get
+        for key, value_type, kind, is_string, prop in required:
+            value = get(key)
+            if type(value) is not value_type or not (value.strip() if is_string else value):
+                _report_required(obj, (parent, at, index), key, kind, prop, violations)
+
+        for prop, keys in non_empty:
+            for k in keys:
+                value = get(k)
+                if type(value) is list and value:
+                    break
+            else:
+                violations.append(empty(format_path((parent, at, index)), prop))
+
+        if not children:
+            return
+        # the path tuple of an entity is only built when it has children, leaf
+        # entities get their location passed through as plain arguments
+        path = (parent, at, index)
+        for key, child, is_list, prop in children:
+            if key not in obj:
+                continue
+            # a present container must have the right type, null included
+            value = obj[key]
+            if not is_list:
+                checks[child](value, path, key, None, violations)
+            elif type(value) is list:
+                check_item = checks[child]
+                for i, item in enumerate(value):
+                    check_item(item, path, key, i, violations)
+            else:
+                violations.append(wrong_type(format_path((path, key, None)), prop, "array"))
+
+    return check
+
+
+def _build_checks() -> dict:
+    checks = {}
+    for entity in SCHEMA:
+        checks[entity] = _build_check(entity, checks)
+
+    return checks
+
+
+_check_spec = _build_checks()["spec"]
+
+
+def validate(spec) -> list:
+    violations = []
+    _check_spec(spec, None, None, None, violations)
+    return violations
@@ -1,8 +1,10 @@
-from flask import Blueprint, jsonify, request, abort
-from app.mod_repo import package_manager, file_handler, db_handler
+from flask import Blueprint, Response, jsonify, request, abort, make_response, url_for, stream_with_context, \
+    current_app
+from app.mod_repo import file_handler, db_handler, signature_index, cache, publisher, catalogue
 from app.mod_repo.models import Transformation
-from app.mod_tm import deployer
-import traceback
+import hashlib
+import json
+import tarfile
 
 mod_repo = Blueprint('repo', __name__)
 
@@ -11,11 +13,44 @@ mod_repo = Blueprint('repo', __name__)
 @mod_repo.route('/apps')
 def find_apps():
     tags = request.args.getlist('tags[]')
-    apps = db_handler.find_apps_by_tags(tags)
-    for app in apps:
-        app["appInfo"].pop('path', None)
+    fields = [f for f in request.args.get('fields', '').split(',') if f]
+    limit = request.args.get('limit', type=int)
+    page_token = request.args.get('pageToken')
+    if limit is not None and limit <= 0:
+        abort(400)
+
+    return conditional_response(apps_collection_etag(), lambda: list_apps(tags, fields, limit, page_token))
+
+
+def list_apps(tags, fields, limit, page_token):
+    try:
+        cursor, next_token = db_handler.find_apps_page(tags, fields, limit, page_token)
+    except ValueError:
+        abort(400)
+
+    headers = {}
+    if next_token:
+        headers["X-Next-Page-Token"] = next_token
 
-    return jsonify(apps), 200
+    if request.args.get('format') == 'ndjson' or request_wants_ndjson():
+        def generate():
+            for app in cursor:
+                strip_app_internals(app)
+                yield json.dumps(app) + "\n"
+
+        return Response(generate(), mimetype='application/x-ndjson', headers=headers)
+
+    apps = [strip_app_internals(app) for app in cursor]
+
+    return jsonify(apps), 200, headers
+
+
+def strip_app_internals(app):
+    if "appInfo" in app:
+        app["appInfo"].pop('path', None)
+    for t in app.get("transformations", []):
+        t.pop('_id', None)
+    return app
 
 
 @mod_repo.route('/apps', methods=['POST'])
@@ -24,67 +59,98 @@ def publish_app():
         abort(400)
 
     data = request.json
-    temp_app_path = file_handler.get_app_archive_from_url(data["name"], data["archiveURL"])
+    if "name" not in data or "archiveURL" not in data:
+        abort(400)
+    priority = data.get("priority", 0)
+    if not isinstance(priority, int) or isinstance(priority, bool) or not 0 <= priority <= 9:
+        abort(400)
+    if data.get("test", False) is not False:
+        # accepting the flag without running the tests would report untested apps as tested
+        return jsonify({"error": "test runs are not supported yet"}), 501
 
-    pkg_spec = package_manager.deserialize_package_specification(temp_app_path)
-    package_manager.generate_dockerfile(pkg_spec, temp_app_path)
+    job_id = publisher.start_publish(data)
+    status_url = url_for('repo.get_publish_job', job_id=job_id)
 
-    try:
-        if data["deploy"] is True:
-            tag = deployer.generate_image_tag(pkg_spec.app_info.name, pkg_spec.app_info.version)
-            provider = deployer.deploy_app(temp_app_path, tag)
-            pkg_spec.app_info.providers.append(provider)
-
-            for t in pkg_spec.t_specs:
-                t.providers.append(provider)
-    except:
-        # deployment unsuccessful
-        # TODO: rollback everything
-        print("deployment error")
-        return jsonify("deployment error"), 500
+    return jsonify({"jobID": job_id, "status": status_url}), 202, {"Location": status_url}
 
-    try:
-        app_path = file_handler.store_app_files(temp_app_path, pkg_spec.app_info.id)
-        pkg_spec.app_info.path = app_path
-    except:
-        # storing files went wrong
-        print("file system storage error")
-        return jsonify("file system storage error"), 500
 
-    try:
-        pkg_spec = db_handler.store_app(pkg_spec)
+@mod_repo.route('/publish-jobs/<job_id>')
+def get_publish_job(job_id):
+    job = db_handler.find_publish_job(job_id)
+    if job is None:
+        abort(404)
+
+    return jsonify(job)
+
+
+@mod_repo.route('/builds/<build_id>')
+def get_build(build_id):
+    build = db_handler.find_build(build_id, request.args.get('logLines', type=int))
+    if build is None:
+        abort(404)
+
+    return jsonify(build)
 
-    except Exception:
-        # storing app in DB error
-        print("DB storage error")
-        print(traceback.format_exc())
-        return jsonify("DB storage error"), 500
 
-    if data["test"] is True:
-        # perform a test run
-        pass
+@mod_repo.route('/builds/<build_id>', methods=['DELETE'])
+def cancel_build(build_id):
+    build = db_handler.cancel_build(build_id)
+    if build is None:
+        abort(404)
+    if build["state"] not in ("QUEUED", "RUNNING", "CANCELLED"):
+        # already finished
+        return make_response(jsonify(build), 409)
 
-    return jsonify(pkg_spec.to_json_str())
+    return jsonify(build), 202
 
 
 @mod_repo.route('/apps/<app_id>')
 def get_app_by_id(app_id):
-    doc = db_handler.find_app(app_id)
+    doc, etag = db_handler.find_app_and_content_hash(app_id)
+    if doc is None:
+        abort(404)
     doc["appInfo"].pop('path', None)
 
-    return jsonify(doc)
+    return conditional_response(etag, lambda: jsonify(doc))
+
+
+@mod_repo.route('/apps/<app_id>/package')
+def get_app_package(app_id):
+    doc = db_handler.find_app(app_id)
+    if doc is None:
+        abort(404)
+
+    response = Response(stream_with_context(file_handler.stream_app_package(doc["appInfo"]["path"])),
+                        mimetype="application/gzip")
+    response.headers["Content-Disposition"] = "attachment; filename=prov-pkg.tar.gz"
+
+    return response
 
 
 @mod_repo.route('/apps/<app_id>', methods=['DELETE'])
 def delete_app(app_id):
-    doc = db_handler.find_app(app_id)
-    path = doc["appInfo"]["path"]
-    file_handler.remove_dir_tree(path)
-    db_handler.delete_app(app_id)
+    # documents go first, an app is never served while its files are missing
+    paths = db_handler.delete_apps([app_id])
+    if not paths:
+        abort(404)
+    file_handler.remove_apps_files(paths.values())
 
     return jsonify({"status": "OK"})
 
 
+@mod_repo.route('/apps', methods=['DELETE'])
+def delete_apps():
+    body = request.get_json(silent=True) or {}
+    app_ids = body.get("appIDs")
+    if not isinstance(app_ids, list) or not app_ids or not all(isinstance(a, str) for a in app_ids):
+        abort(400)
+
+    paths = db_handler.delete_apps(app_ids)
+    file_handler.remove_apps_files(paths.values())
+
+    return jsonify({"deleted": list(paths), "notFound": [a for a in app_ids if a not in paths]})
+
+
 @mod_repo.route('/apps/<app_id>', methods=['PUT'])
 def update_app(app_id):
 
@@ -93,9 +159,13 @@ def update_app(app_id):
 
 @mod_repo.route('/apps/<app_id>/transformations')
 def get_transfs_by_app_id(app_id):
-    doc = db_handler.find_app_transformations(app_id)
+    doc, etag = db_handler.find_app_and_content_hash(app_id)
+    if doc is None:
+        abort(404)
+    if etag is not None:
+        etag += "-transformations"
 
-    return jsonify(doc)
+    return conditional_response(etag, lambda: jsonify(doc["transformations"]))
 
 
 @mod_repo.route('/transformations')
@@ -106,6 +176,25 @@ def find_transformations():
 
         return jsonify(t)
 
+    match = request.args.get('match')
+    if match:
+        try:
+            sig_query = signature_index.SignatureQuery(
+                match,
+                pnum=request.args.get('pnum', type=int),
+                pmin=request.args.get('pmin', type=int),
+                pmax=request.args.get('pmax', type=int),
+                infiles=request.args.getlist('infile[]'),
+                infilesets=request.args.getlist('infsets[]'),
+                outfiles=request.args.getlist('outfile[]')
+            )
+        except ValueError:
+            abort(400)
+
+        t_list = db_handler.find_transformations_by_structure(sig_query)
+
+        return jsonify(t_list)
+
     else:
         pnum = int(request.args.get('pnum'))
         infiles = request.args.getlist('infile[]')
@@ -122,9 +211,77 @@ def find_transformations():
 
 @mod_repo.route('/transformations/<t_id>')
 def get_transform_by_id(t_id):
-    t = db_handler.find_transformation_by_id(t_id)
+    doc, etag = db_handler.find_transformation_and_content_hash(t_id)
+
+    return conditional_response(etag, lambda: jsonify(doc))
+
+
+@mod_repo.route('/admin/indexes')
+def get_index_report():
+    report = {
+        "indexes": db_handler.get_index_stats(),
+        "queryPlans": db_handler.explain_queries()
+    }
+
+    return jsonify(report)
+
+
+@mod_repo.route('/admin/cache')
+def get_cache_stats():
+    return jsonify(cache.get_stats())
+
+
+@mod_repo.route('/admin/catalogue')
+def export_catalogue():
+    stream = catalogue.export_catalogue(current_app.config["CATALOGUE_BATCH_SIZE"])
+    response = Response(stream_with_context(stream), mimetype="application/gzip")
+    response.headers["Content-Disposition"] = "attachment; filename=catalogue.tar.gz"
+
+    return response
+
+
+@mod_repo.route('/admin/catalogue', methods=['POST'])
+def import_catalogue():
+    build = request.args.get('build', 'false').lower() == 'true'
+    try:
+        report = catalogue.import_catalogue(request.stream, build_missing_images=build)
+    except catalogue.CatalogueConflict as e:
+        return make_response(jsonify({"error": str(e)}), 409)
+    except (tarfile.TarError, ValueError) as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+
+    return jsonify(report)
+
+
+@mod_repo.route('/admin/base-images')
+def get_base_images():
+    return jsonify(db_handler.get_base_images_report())
+
+
+def conditional_response(etag, build_response):
+    # a matching If-None-Match is answered before the body is serialized
+    if etag is not None and request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    response = make_response(build_response())
+    if etag is not None:
+        response.set_etag(etag)
+    return response
+
+
+def apps_collection_etag():
+    # the listing changes only when an app is published or deleted, which bumps
+    # the collection version; the query string selects the page and projection
+    version = db_handler.get_apps_version()
+    key = str(version) + "|" + request.query_string.decode("utf-8") + "|" + str(request.accept_mimetypes.best)
+
+    return "apps-" + hashlib.sha256(key.encode("utf-8")).hexdigest()
+
 
-    return jsonify(t)
+def request_wants_ndjson():
+    return request.accept_mimetypes.best == 'application/x-ndjson'
 
 
 def request_wants_json():
@@ -1,21 +1,267 @@
+import io
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 import docker
+from celery.exceptions import SoftTimeLimitExceeded
 from flask import current_app
+from app.mod_repo import db_handler
+from app.mod_repo.dockerfile_generator import BASE_DOCKERFILE_NAME
+from app.mod_tm import docker_client
 
+BUILDKIT_STEP = re.compile(r"^#\d+ \[[^\]]*\d+/\d+\]")
+BUILDKIT_CACHED = re.compile(r"^#\d+ CACHED")
+CLASSIC_RUNNING = re.compile(r"^\s*---> Running in ([0-9a-f]+)")
 
-def deploy_app(dockerfile_path, tag, provider=None):
+
+class BuildError(Exception):
+    def __init__(self, msg, log=None, state="FAILURE"):
+        self.msg = msg
+        self.log = log
+        self.state = state
+
+    def __str__(self):
+        return self.msg
+
+
+class BuildMonitor:
+    # forwards the build output to the build's status document and stops the
+    # build once it is cancelled or runs out of time; a watchdog thread checks
+    # every interval, so a step that prints nothing is stopped as well
+    def __init__(self, build_id, timeout, max_lines, interval=1.0):
+        self.build_id = build_id
+        self.deadline = time.perf_counter() + timeout
+        self.max_lines = max_lines
+        self.interval = interval
+        self.lines = []
+        self.lock = threading.Lock()
+        self.error = None
+
+    def line(self, text):
+        text = text.rstrip("\n")
+        if text:
+            with self.lock:
+                self.lines.append(text)
+        if self.error is not None:
+            raise self.error
+
+    def flush(self):
+        # returns the BuildError the build has to be stopped with, if any
+        with self.lock:
+            lines, self.lines = self.lines, []
+        cancel = False
+        if self.build_id is not None:
+            cancel = db_handler.append_build_log(self.build_id, lines, self.max_lines)
+        if cancel:
+            return BuildError("build cancelled", state="CANCELLED")
+        if time.perf_counter() > self.deadline:
+            return BuildError("build timed out", state="TIMEOUT")
+        return None
+
+    @contextmanager
+    def watching(self, stop):
+        # stop() is called from the watchdog thread and has to abort the running build
+        done = threading.Event()
+
+        def watch():
+            while not done.wait(self.interval):
+                try:
+                    error = self.flush()
+                except Exception as e:
+                    # the build goes on, the next check may reach the database again
+                    print("build status could not be updated", e)
+                    continue
+                if error is not None:
+                    self.error = error
+                    try:
+                        stop()
+                    except Exception as e:
+                        print("build could not be stopped", e)
+                    return
+
+        watchdog = threading.Thread(target=watch, daemon=True)
+        watchdog.start()
+        try:
+            yield
+        except Exception:
+            # a build aborted by stop() fails with whatever error the builder reports
+            if self.error is not None:
+                raise self.error
+            raise
+        finally:
+            done.set()
+            watchdog.join()
+        if self.error is not None:
+            raise self.error
+
+
+def deploy_app(dockerfile_path, tag, provider=None, base_tag=None, build_id=None):
+    # raises BuildError if the image could not be built
+    if build_id is not None and db_handler.start_build(build_id, tag) is None:
+        raise BuildError("build cancelled", state="CANCELLED")
+
+    monitor = BuildMonitor(build_id, current_app.config["DOCKER_BUILD_TIMEOUT"],
+                           current_app.config["DOCKER_BUILD_LOG_LINES"])
     try:
-        client = docker.from_env()
-        image = client.images.build(path=dockerfile_path, tag=tag, rm=True)
-        if provider is None:
-            p = "default"
+        base_image = None
+        if base_tag is not None:
+            base_image = ensure_base_image(dockerfile_path, base_tag, monitor)
+        if current_app.config["DOCKER_BUILDKIT"]:
+            image_id, metrics = build_image_buildkit(tag, monitor, path=dockerfile_path)
         else:
-            p = provider
+            image_id, metrics = build_image(tag, monitor, path=dockerfile_path)
+        metrics["baseImage"] = base_image
+        error = monitor.flush()
+        if error is not None:
+            raise error
+    except Exception as e:
+        if isinstance(e, SoftTimeLimitExceeded):
+            e = BuildError("build timed out", state="TIMEOUT")
+        elif not isinstance(e, BuildError):
+            e = BuildError(str(e))
+        if build_id is not None:
+            try:
+                monitor.lines.append(e.msg)
+                db_handler.append_build_log(build_id, monitor.lines, monitor.max_lines)
+            finally:
+                db_handler.finish_build(build_id, e.state, {"error": e.msg})
+        raise e
 
-        return {"providerQName": p, "pkgID": image.id}
+    if build_id is not None:
+        db_handler.finish_build(build_id, "SUCCESS", {"imageID": image_id, "metrics": metrics})
+    if provider is None:
+        p = "default"
+    else:
+        p = provider
 
-    except Exception as e:
-        # TODO: handle exception
-        return {"error": e}
+    return {"providerQName": p, "pkgID": image_id, "buildMetrics": metrics}
+
+
+def ensure_base_image(dockerfile_path, base_tag, monitor):
+    # shared base images are built by the first app needing them and reused afterwards
+    image = find_image(base_tag)
+    if image is not None:
+        return {"tag": base_tag, "imageID": image.id, "built": False}
+
+    with open(os.path.join(dockerfile_path, BASE_DOCKERFILE_NAME)) as f:
+        dockerfile = f.read()
+    # the base image needs no build context, only its Dockerfile is sent
+    if current_app.config["DOCKER_BUILDKIT"]:
+        image_id, metrics = build_image_buildkit(base_tag, monitor, dockerfile=dockerfile)
+    else:
+        image_id, metrics = build_image(base_tag, monitor, fileobj=io.BytesIO(dockerfile.encode("utf-8")))
+
+    return {"tag": base_tag, "imageID": image_id, "built": True, "duration": metrics["duration"]}
+
+
+def build_image(tag, monitor, path=None, fileobj=None):
+    # the low-level API streams the build output, which tells the reused layers apart;
+    # unlike other calls a build gets its own client, closing it aborts the build in
+    # the daemon and its read timeout is the build timeout
+    client = docker_client.create_client(timeout=current_app.config["DOCKER_BUILD_TIMEOUT"])
+    start = time.perf_counter()
+    steps = cached_steps = 0
+    log = []
+    running = {"container": None}
+
+    def stop():
+        # the step's container is killed, the builder then fails the build
+        if running["container"] is not None:
+            docker_client.call("containers.kill", lambda c: c.api.kill(running["container"]))
+
+    try:
+        with monitor.watching(stop):
+            for chunk in client.api.build(path=path, fileobj=fileobj, tag=tag, rm=True, decode=True):
+                if "error" in chunk:
+                    raise BuildError(chunk["error"].strip(), log)
+                line = chunk.get("stream", "")
+                log.append(line)
+                monitor.line(line)
+                if line.startswith("Step "):
+                    steps += 1
+                    running["container"] = None
+                elif line.strip() == "---> Using cache":
+                    cached_steps += 1
+                else:
+                    match = CLASSIC_RUNNING.match(line)
+                    if match:
+                        running["container"] = match.group(1)
+
+        image_id = client.images.get(tag).id
+    finally:
+        client.api.close()
+
+    return image_id, build_metrics("docker", start, steps, cached_steps)
+
+
+def build_image_buildkit(tag, monitor, path=None, dockerfile=None):
+    # with a Dockerfile but no path the build runs without context (docker build -)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        iid_file = os.path.join(tmp_dir, "iid")
+        env = dict(os.environ, DOCKER_BUILDKIT="1")
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            ["docker", "build", "--progress=plain", "--iidfile", iid_file, "-t", tag, path or "-"],
+            env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            universal_newlines=True)
+        log = []
+        try:
+            with monitor.watching(process.kill):
+                if dockerfile is not None:
+                    process.stdin.write(dockerfile)
+                process.stdin.close()
+                for line in process.stdout:
+                    log.append(line.rstrip("\n"))
+                    monitor.line(line)
+                returncode = process.wait()
+                if returncode != 0:
+                    raise BuildError("docker build exited with %d" % returncode, log[-50:])
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        with open(iid_file) as f:
+            image_id = f.read().strip()
+
+    steps = sum(1 for line in log if BUILDKIT_STEP.match(line))
+    cached_steps = sum(1 for line in log if BUILDKIT_CACHED.match(line))
+    return image_id, build_metrics("buildkit", start, steps, cached_steps)
+
+
+def build_metrics(builder, start, steps, cached_steps):
+    return {
+        "builder": builder,
+        "duration": time.perf_counter() - start,
+        "steps": steps,
+        "cachedSteps": cached_steps
+    }
+
+
+def find_image(image_id):
+    try:
+        return docker_client.call("images.get", lambda c: c.images.get(image_id), retries=1)
+    except docker.errors.ImageNotFound:
+        return None
+
+
+def image_exists(image_id):
+    return find_image(image_id) is not None
+
+
+def get_shared_base_tag(dockerfile_path):
+    # the shared base image an app's Dockerfile starts FROM, if any
+    if not os.path.exists(os.path.join(dockerfile_path, BASE_DOCKERFILE_NAME)):
+        return None
+    with open(os.path.join(dockerfile_path, "Dockerfile")) as f:
+        for line in f:
+            if line.startswith("FROM "):
+                return line.split()[1]
+
+    return None
 
 
 def generate_image_tag(app_name, app_version):
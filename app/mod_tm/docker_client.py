@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+import docker
+import requests
+
+# One Docker API client per process instead of one per call. Like the MongoDB
+# client it is recreated after a fork, it is pinged when it has not been used for
+# a while and dropped after connection errors, so the next call reconnects.
+
+_client = None
+_client_pid = None
+_client_settings = None
+_last_used = 0
+_lock = threading.Lock()
+
+_stats = {}
+_stats_lock = threading.Lock()
+# per-thread latencies of the calls made for the current task, see collect()
+_collected = threading.local()
+
+
+def init_app(app):
+    configure(app.config)
+
+
+def configure(config):
+    global _client_settings
+    with _lock:
+        _client_settings = {
+            "timeout": config.get("DOCKER_TIMEOUT", 60),
+            "num_pools": config.get("DOCKER_NUM_POOLS", 25),
+            "version": config.get("DOCKER_API_VERSION"),
+            "health_check_interval": config.get("DOCKER_HEALTH_CHECK_INTERVAL", 30)
+        }
+    reset()
+
+
+def create_client(timeout=None) -> docker.DockerClient:
+    if _client_settings is None:
+        raise RuntimeError("docker client is not configured, call docker_client.init_app(app) first")
+    kwargs = docker.utils.kwargs_from_env()
+    if _client_settings["version"]:
+        kwargs["version"] = _client_settings["version"]
+
+    return docker.DockerClient(timeout=timeout or _client_settings["timeout"],
+                               num_pools=_client_settings["num_pools"], **kwargs)
+
+
+def get_client() -> docker.DockerClient:
+    global _client, _client_pid, _last_used
+    pid = os.getpid()
+    with _lock:
+        if _client is None or _client_pid != pid:
+            # the connections of a client inherited through fork must not be reused
+            _client = create_client()
+            _client_pid = pid
+            _last_used = time.monotonic()
+            return _client
+        client = _client
+        idle = time.monotonic() - _last_used
+        _last_used = time.monotonic()
+
+    if idle > _client_settings["health_check_interval"]:
+        try:
+            call("ping", lambda c: c.ping(), client=client)
+        except Exception:
+            # e.g. after a daemon restart, a new client is created and a daemon
+            # that is still unreachable fails the caller's own call
+            reset()
+            return get_client()
+
+    return client
+
+
+def call(operation, fn, retries=0, client=None):
+    # runs fn(client) and records its latency, retries are meant for reads only
+    while True:
+        start = time.perf_counter()
+        try:
+            result = fn(client or get_client())
+        except requests.exceptions.ConnectionError:
+            _record(operation, time.perf_counter() - start, error=True)
+            reset()
+            if retries <= 0:
+                raise
+            retries -= 1
+            client = None
+            continue
+        except Exception:
+            _record(operation, time.perf_counter() - start, error=True)
+            raise
+        _record(operation, time.perf_counter() - start)
+        return result
+
+
+def _record(operation, duration, error=False):
+    collected = getattr(_collected, "calls", None)
+    if collected is not None:
+        c = collected.setdefault(operation, {"calls": 0, "total": 0.0})
+        c["calls"] += 1
+        c["total"] += duration
+
+    with _stats_lock:
+        s = _stats.get(operation)
+        if s is None:
+            s = _stats[operation] = {"calls": 0, "errors": 0, "total": 0.0, "max": 0.0}
+        s["calls"] += 1
+        s["total"] += duration
+        s["max"] = max(s["max"], duration)
+        if error:
+            s["errors"] += 1
+
+
+def collect():
+    # starts recording the calls of the current thread, returns the recording dict
+    _collected.calls = {}
+    return _collected.calls
+
+
+def stop_collecting():
+    calls = getattr(_collected, "calls", None) or {}
+    _collected.calls = None
+    return calls
+
+
+def get_stats():
+    with _stats_lock:
+        stats = {}
+        for operation, s in _stats.items():
+            stats[operation] = dict(s, mean=s["total"] / s["calls"] if s["calls"] else 0.0)
+
+    return {"pid": os.getpid(), "connected": _client is not None and _client_pid == os.getpid(),
+            "operations": stats}
+
+
+def reset():
+    global _client, _client_pid
+    with _lock:
+        if _client is not None and _client_pid == os.getpid():
+            try:
+                _client.api.close()
+            except Exception:
+                pass
+        _client = None
+        _client_pid = None
@@ -0,0 +1,165 @@
+import os
+import shutil
+import tarfile
+import threading
+import zipfile
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+from flask import current_app
+from app.mod_repo import file_handler
+
+# Downloads the input files and filesets of a task concurrently. The number of
+# downloads is bounded per worker process and per host, connections are kept in
+# one pooled session and a failed download is retried with exponential backoff.
+# The first download that fails for good cancels the others, queued ones never
+# start and running ones stop before their next attempt.
+
+RETRY_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+_session = None
+_host_limits = {}
+_lock = threading.Lock()
+
+
+class DownloadError(Exception):
+    def __init__(self, msg):
+        self.msg = msg
+
+    def __str__(self):
+        return self.msg
+
+
+def get_session(pool_size):
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def get_host_limit(url, per_host):
+    host = urlsplit(url).netloc
+    with _lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(per_host)
+        return _host_limits[host]
+
+
+def reset():
+    # prefork children must not reuse the connections of the parent process
+    global _session
+    with _lock:
+        _session = None
+        _host_limits.clear()
+
+
+class TruncatedDownload(Exception):
+    pass
+
+
+def is_retryable(error):
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRY_STATUS_CODES
+    # filesets read the raw body, where a dropped connection surfaces as a urllib3 error
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                              ProtocolError, ReadTimeoutError, TruncatedDownload))
+
+
+def is_truncated(response):
+    # the body ended before the announced length, the archive was cut off rather than corrupt
+    length = response.headers.get("Content-Length")
+    try:
+        return length is not None and response.raw.read(1) == b"" and response.raw.tell() < int(length)
+    except (ProtocolError, ReadTimeoutError):
+        return True
+    except ValueError:
+        return False
+
+
+def extract_fileset(response, destination, config):
+    try:
+        return file_handler.stream_extract_archive(response, destination)
+    except (tarfile.ReadError, zipfile.BadZipFile, EOFError) as e:
+        if is_truncated(response):
+            raise TruncatedDownload("fileset archive was truncated: " + str(e))
+        raise
+
+
+def save_file(response, destination, config):
+    size = 0
+    with open(destination, 'wb') as f:
+        for chunk in response.iter_content(config["ARCHIVE_CHUNK_SIZE"]):
+            size += len(chunk)
+            if size > config["ARCHIVE_MAX_SIZE"]:
+                raise file_handler.ArchiveError("input file exceeds the maximum size of " +
+                                                str(config["ARCHIVE_MAX_SIZE"]) + " bytes")
+            f.write(chunk)
+    if is_truncated(response):
+        raise TruncatedDownload("input file was truncated after " + str(size) + " bytes")
+    return {"size": size}
+
+
+def download(app, url, destination, store, cancelled):
+    # runs in a pool thread, store(response, destination, config) writes the body
+    with app.app_context():
+        config = app.config
+        session = get_session(config["INPUT_DOWNLOAD_WORKERS"])
+        host_limit = get_host_limit(url, config["INPUT_DOWNLOAD_PER_HOST"])
+        timing = {"url": url, "attempts": 0, "waited": 0.0}
+        started = time.monotonic()
+
+        while True:
+            if cancelled.is_set():
+                raise DownloadError("download of input " + url + " was cancelled")
+            timing["attempts"] += 1
+            queued = time.monotonic()
+            with host_limit:
+                timing["waited"] += time.monotonic() - queued
+                try:
+                    response = session.get(url, stream=True, timeout=config["INPUT_DOWNLOAD_TIMEOUT"])
+                    with response:
+                        response.raise_for_status()
+                        timing.update(store(response, destination, config))
+                    break
+                except Exception as e:
+                    # a partially written input is never kept
+                    if os.path.isdir(destination):
+                        shutil.rmtree(destination, ignore_errors=True)
+                        os.makedirs(destination)
+                    elif os.path.exists(destination):
+                        os.remove(destination)
+                    if not is_retryable(e) or timing["attempts"] > config["INPUT_DOWNLOAD_RETRIES"]:
+                        raise DownloadError("input " + url + " could not be downloaded: " + str(e))
+                    print("retrying download of", url, e)
+            cancelled.wait(config["INPUT_DOWNLOAD_BACKOFF"] * 2 ** (timing["attempts"] - 1))
+
+        timing["seconds"] = round(time.monotonic() - started, 3)
+        timing["waited"] = round(timing["waited"], 3)
+        return timing
+
+
+def download_all(downloads):
+    # downloads are (key, url, destination, store), returns {key: timing}
+    app = current_app._get_current_object()
+    if not downloads:
+        return {}
+    cancelled = threading.Event()
+    with ThreadPoolExecutor(max_workers=app.config["INPUT_DOWNLOAD_WORKERS"]) as executor:
+        futures = [(key, executor.submit(download, app, url, destination, store, cancelled))
+                   for key, url, destination, store in downloads]
+        done, pending = wait([future for key, future in futures], return_when=FIRST_EXCEPTION)
+        for future in done:
+            if future.exception() is not None:
+                cancelled.set()
+                for other in pending:
+                    other.cancel()
+                # result() re-raises the error of the failed download
+                future.result()
+        return {key: future.result() for key, future in futures}
@@ -1,7 +1,7 @@
-import os, uuid, mimetypes, requests
+import os
 from app.mod_repo import db_handler
+from app.mod_tm import input_loader
 from config import BASE_DIR
-from pyunpack import Archive
 
 
 def get_root_repo_folder():
@@ -32,8 +32,8 @@ class TransformationTask:
         self.provider = self.__choose_provider(request_body)
         self.result_endpoint = request_body["resultsEndpoint"]
 
-        self.__materialize_input_files()
-        self.__materialize_input_filesets()
+        # download times of the inputs by alias
+        self.input_timings = self.__materialize_inputs()
 
         self.invocation_cmd = self.build_inv_cmd()
 
@@ -102,27 +102,37 @@ class TransformationTask:
         else:
             return {}
 
+    def __materialize_inputs(self):
+        # input files and filesets are all downloaded at the same time
+        downloads = self.__materialize_input_files() + self.__materialize_input_filesets()
+        return input_loader.download_all(downloads)
+
     def __materialize_input_files(self):
-        pass
+        downloads = []
+        for a in self.input_files_map:
+            file = self.input_files_map[a]
+            file["requiredPath"] = file.get("requiredPath") or "{r}/"
+            if file["requiredPath"].endswith("/"):
+                filename = file["inputName"] + "." + file["format"]
+            else:
+                filename = os.path.basename(file["requiredPath"])
+            temp_dir = os.path.join(self.task_folder_path, a.replace("$", ""))
+            create_folder_if_not_exists(temp_dir)
+            local_path = os.path.join(temp_dir, filename)
+
+            downloads.append((a, file["link"], local_path, input_loader.save_file))
+            file["link"] = local_path
+        return downloads
 
     def __materialize_input_filesets(self):
+        downloads = []
         for a in self.input_filesets_map:
-            response = requests.get(self.input_filesets_map[a]["linkToArchive"], stream=True)
-            content_type = response.headers['content-type']
-            extension = mimetypes.guess_extension(content_type)
-            temp_file = "archive" + extension
             temp_dir = os.path.join(self.task_folder_path, a.replace("$", ""))
-            if not os.path.exists(temp_dir):
-                os.makedirs(temp_dir)
-            temp_path = os.path.join(temp_dir, temp_file)
-
-            with open(temp_path, 'wb') as f:
-                for chunk in response:
-                    f.write(chunk)
+            create_folder_if_not_exists(temp_dir)
 
-            Archive(temp_path).extractall(temp_dir)
-            os.remove(temp_path)
+            downloads.append((a, self.input_filesets_map[a]["linkToArchive"], temp_dir, input_loader.extract_fileset))
             self.input_filesets_map[a]["linkToArchive"] = temp_dir
+        return downloads
 
     def __choose_invocation(self):
         return self.app["invocations"][0]
@@ -1,37 +1,35 @@
 from config import BASE_DIR
-import docker, os, uuid, requests, mimetypes, tarfile, time
-from pyunpack import Archive
-from io import BytesIO
+import os, io, uuid, requests, mimetypes, tarfile, shlex
 import celery
-from app.mod_repo import db_handler
-from app.mod_tm.models import TransformationTask
+from flask import current_app
+from app.mod_repo import db_handler, file_handler
+from app.mod_tm import docker_client, warm_pool
+from app.mod_tm.models import TransformationTask, get_root_repo_folder
 
 
 def get_docker_client():
-    return docker.from_env()
+    return docker_client.get_client()
 
 
 def get_docker_image(image_id):
-    client = get_docker_client()
-    return client.images.get(image_id)
+    return docker_client.call("images.get", lambda c: c.images.get(image_id), retries=1)
 
 
 def get_docker_container(container_id):
-    client = get_docker_client()
-    return client.containers.get(container_id)
+    return docker_client.call("containers.get", lambda c: c.containers.get(container_id), retries=1)
 
 
-def create_docker_container(image_obj, inv_cmd):
-    client = get_docker_client()
-    return client.containers.create(image_obj, inv_cmd)
+def create_docker_container(image_obj, inv_cmd, volumes=None):
+    return docker_client.call("containers.create", lambda c: c.containers.create(image_obj, inv_cmd,
+                                                                                   volumes=volumes))
 
 
 def start_container(container_obj):
-    container_obj.start()
+    docker_client.call("containers.start", lambda c: container_obj.start())
 
 
 def remove_container(container_obj):
-    container_obj.remove(v=True)
+    docker_client.call("containers.remove", lambda c: container_obj.remove(v=True))
 
 
 def get_container_status(container_id):
@@ -40,7 +38,7 @@ def get_container_status(container_id):
 
 
 def wait_for_container_finish(container_obj):
-    exit_code = container_obj.wait()
+    exit_code = docker_client.call("containers.wait", lambda c: container_obj.wait())
     return exit_code
 
 
@@ -54,108 +52,285 @@ def get_required_path(path_str):
         return None
 
 
+def stream_tarball(entries, chunk_size=1024 ** 2):
+    # writes a tar archive chunk by chunk, entries are (path, arcname) and a file
+    # is read while it is sent instead of being buffered as a whole
+    for path, arcname in entries:
+        st = os.lstat(path)
+        info = tarfile.TarInfo(arcname)
+        info.mode = st.st_mode & 0o7777
+        info.mtime = st.st_mtime
+        if os.path.islink(path):
+            info.type = tarfile.SYMTYPE
+            info.linkname = os.readlink(path)
+        elif os.path.isdir(path):
+            info.type = tarfile.DIRTYPE
+        else:
+            info.size = st.st_size
+        yield info.tobuf(format=tarfile.GNU_FORMAT)
+
+        if info.isreg():
+            remaining = info.size
+            with open(path, 'rb') as f:
+                while remaining > 0:
+                    chunk = f.read(min(chunk_size, remaining))
+                    if not chunk:
+                        raise IOError("file " + path + " was truncated while being sent")
+                    remaining -= len(chunk)
+                    yield chunk
+            padding = (tarfile.BLOCKSIZE - info.size % tarfile.BLOCKSIZE) % tarfile.BLOCKSIZE
+            if padding:
+                yield b"\0" * padding
+
+    yield b"\0" * (2 * tarfile.BLOCKSIZE)
+
+
+def list_fileset_entries(fileset_dir):
+    for root, dirs, files in os.walk(fileset_dir):
+        for name in sorted(dirs) + sorted(files):
+            path = os.path.join(root, name)
+            yield path, os.path.relpath(path, fileset_dir)
+
+
 def create_file_tarball(artifact_file):
-    pw_tarstream = BytesIO()
-    pw_tar = tarfile.TarFile(fileobj=pw_tarstream, mode='w')
-    file_data = open(artifact_file, 'r').read()
-    tarinfo = tarfile.TarInfo(name=artifact_file)
-    tarinfo.size = len(file_data)
-    tarinfo.mtime = time.time()
-    # tarinfo.mode = 0600
-    pw_tar.addfile(tarinfo, BytesIO(file_data))
-    pw_tar.close()
-    pw_tarstream.seek(0)
-    return pw_tarstream
+    return stream_tarball([(artifact_file, os.path.basename(artifact_file))],
+                          current_app.config["ARCHIVE_CHUNK_SIZE"])
 
 
 def create_fileset_tarball(fileset_dir):
-    tar_stream = BytesIO()
-    tar = tarfile.TarFile(fileobj=tar_stream, mode='w')
-    tar.add(fileset_dir, arcname=os.path.sep)
-    tar.close()
-    tar_stream.seek(0)
-    return tar_stream
+    return stream_tarball(list_fileset_entries(fileset_dir), current_app.config["ARCHIVE_CHUNK_SIZE"])
 
 
 def copy_dir_to_container(container_obj, fileset_dir, req_path):
-    with create_fileset_tarball(fileset_dir) as archive:
-        container_obj.put_archive(req_path, archive)
-    return True
+    # the request body is sent chunked while the generator produces it
+    archive = create_fileset_tarball(fileset_dir)
+    return docker_client.call("containers.put_archive", lambda c: container_obj.put_archive(req_path, archive))
 
 
 def copy_file_to_container(container_obj, artifact_file, req_path):
-    with create_file_tarball(artifact_file) as archive:
-        container_obj.put_archive(req_path, archive)
-    return True
-
-
-def copy_output_from_container(container_obj, output_path, destination):
-    stream, stat = container_obj.get_archive(output_path)
-    raw_data = stream.read()
-    output_dir = os.path.join(destination, "output")
-    temp_tar = os.path.join(output_dir, "archive.tar")
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    f = open(temp_tar, 'wb')
-    f.write(raw_data)
-    Archive(temp_tar).extractall(destination)
-    os.remove(temp_tar)
-    return True
-
-
-def post_output_to_consumer(task_path, filename, endpoint):
-    output_path = os.path.join(task_path, filename)
-    data = open(output_path, 'rb').read()
-    res = requests.post(url=endpoint,
-                        data=data,
-                        headers={'Content-Type': 'application/octet-stream'})
+    archive = create_file_tarball(artifact_file)
+    return docker_client.call("containers.put_archive", lambda c: container_obj.put_archive(req_path, archive))
 
 
-@celery.task(bind=True)
-def run_transformation_task(self, request_body):
-
-    task_obj = TransformationTask(request_body, self.request.id)
-    app_image = get_docker_image(task_obj.provider["pkgID"])
-    app_container = create_docker_container(app_image, task_obj.invocation_cmd)
+def get_required_dir(path_str):
+    # an input file's required path is either its folder or the file itself
+    if path_str is None or path_str.endswith("/"):
+        return path_str
+    return os.path.dirname(path_str)
+
+
+def get_host_path(local_path):
+    host_dir = current_app.config["TASKS_HOST_DIR"]
+    local_path = os.path.abspath(local_path)
+    if host_dir:
+        return os.path.join(host_dir, os.path.relpath(local_path, get_root_repo_folder()))
+    return local_path
+
+
+def get_input_volumes(task_obj):
+    # read-only bind mounts of the materialized inputs at their required paths
+    volumes = {}
+    for a in task_obj.input_files_map or {}:
+        f = task_obj.input_files_map[a]
+        req_dir = get_required_dir(get_required_path(f["requiredPath"]))
+        volumes[get_host_path(f["link"])] = {"bind": os.path.join(req_dir, os.path.basename(f["link"])),
+                                             "mode": "ro"}
+    for a in task_obj.input_filesets_map or {}:
+        fs = task_obj.input_filesets_map[a]
+        volumes[get_host_path(fs["linkToArchive"])] = {"bind": get_required_path(fs["requiredPath"]), "mode": "ro"}
+    return volumes
+
+
+class IterableReader(io.RawIOBase):
+    # file-like view of an iterable of byte chunks for tarfile
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self.pending:
+            self.pending = next(self.chunks, None)
+            if self.pending is None:
+                self.pending = b""
+                return 0
+        n = min(len(b), len(self.pending))
+        b[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        return n
+
+
+def copy_output_from_container(container_obj, output_path, destination, forward_to=None):
+    # extracts the archive while it is received from the daemon, files can be
+    # forwarded to a consumer at the same time
+    stream, stat = docker_client.call("containers.get_archive", lambda c: container_obj.get_archive(output_path))
+    if not hasattr(stream, "read"):
+        stream = IterableReader(stream)
+
+    chunk_size = current_app.config["ARCHIVE_CHUNK_SIZE"]
+    outputs = []
+    try:
+        with tarfile.open(fileobj=stream, mode="r|", bufsize=chunk_size) as tar:
+            for member in tar:
+                target = file_handler.get_safe_member_path(destination, member.name)
+                if member.isfile():
+                    outputs.append(extract_output_file(tar, member, target, chunk_size, forward_to))
+                elif member.isdir() or member.issym():
+                    if member.issym():
+                        file_handler.get_safe_member_path(
+                            destination, os.path.join(os.path.dirname(member.name), member.linkname))
+                    tar.extract(member, destination)
+    finally:
+        stream.close()
+
+    return outputs
+
+
+def extract_output_file(tar, member, target, chunk_size, forward_to=None):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    source = tar.extractfile(member)
+    output = {"name": member.name, "size": member.size}
+
+    with open(target, 'wb') as f:
+        def chunks():
+            for chunk in iter(lambda: source.read(chunk_size), b""):
+                f.write(chunk)
+                yield chunk
+
+        written = chunks()
+        if forward_to is not None:
+            try:
+                output["forwarded"] = post_output_to_consumer(member.name, written, forward_to)
+            except requests.RequestException as e:
+                print("output could not be forwarded", member.name, e)
+                output["forwarded"] = None
+        # whatever the consumer did not read still goes to the file
+        for _ in written:
+            pass
+
+    return output
+
+
+def post_output_to_consumer(filename, data, endpoint):
+    res = requests.post(url=endpoint,
+                        data=data,
+                        headers={'Content-Type': 'application/octet-stream',
+                                 'Content-Disposition': 'attachment; filename="%s"' % os.path.basename(filename)})
+    return res.status_code
 
-    self.update_state(state="PROGRESS", meta=populate_meta_info(app_container.id))
 
+def copy_inputs_to_container(container_obj, task_obj):
     if task_obj.input_files_map is not None:
         # copy input files to container
-        pass
+        for a in task_obj.input_files_map:
+            f = task_obj.input_files_map[a]
+            req_input_path = get_required_path(f["requiredPath"])
+            copy_file_to_container(container_obj, f["link"], get_required_dir(req_input_path))
 
     if task_obj.input_filesets_map is not None:
         # copy input filesets to container
         for a in task_obj.input_filesets_map:
             fs = task_obj.input_filesets_map[a]
             req_input_path = get_required_path(fs["requiredPath"])
-            copy_dir_to_container(app_container, fs["linkToArchive"], req_input_path)
+            copy_dir_to_container(container_obj, fs["linkToArchive"], req_input_path)
 
-    start_container(app_container)
 
-    self.update_state(state="PROGRESS", meta=populate_meta_info(app_container.id))
-    if wait_for_container_finish(app_container) == 0:
-        for o in task_obj.transform["outputFiles"]:
-            output_dir = get_required_path(o["accessPath"])
-            filename = o["outputName"] + "." + o["format"]
-            output_path = output_dir + filename
-            copy_output_from_container(app_container, output_path, task_obj.task_folder_path)
+def copy_outputs_from_container(container_obj, task_obj):
+    forward_to = task_obj.result_endpoint if current_app.config["TASK_FORWARD_OUTPUTS"] else None
+    outputs = []
+    for o in task_obj.transform["outputFiles"]:
+        output_dir = get_required_path(o["accessPath"])
+        filename = o["outputName"] + "." + o["format"]
+        output_path = output_dir + filename
+        outputs.extend(copy_output_from_container(container_obj, output_path, task_obj.task_folder_path,
+                                                  forward_to))
+    return outputs
+
 
-            # task_processor.post_output_to_consumer(task_path, filename, req_body["resultsEndpoint"])
+@celery.task(bind=True)
+def run_transformation_task(self, request_body):
+
+    # the Docker API time of the task, reported with its final state
+    docker_client.collect()
+    task_obj = TransformationTask(request_body, self.request.id)
+    app_image = get_docker_image(task_obj.provider["pkgID"])
+
+    if current_app.config["WARM_POOL_ENABLED"]:
+        return run_in_warm_container(self, task_obj, app_image)
+
+    mount_inputs = current_app.config["TASK_INPUTS_MODE"] == "mount"
+    volumes = get_input_volumes(task_obj) if mount_inputs else None
+    app_container = create_docker_container(app_image, task_obj.invocation_cmd, volumes)
+
+    self.update_state(state="PROGRESS", meta=populate_meta_info(app_container))
 
+    if not mount_inputs:
+        copy_inputs_to_container(app_container, task_obj)
+
+    start_container(app_container)
+
+    self.update_state(state="PROGRESS", meta=populate_meta_info(app_container))
+    if wait_for_container_finish(app_container) == 0:
+        outputs = copy_outputs_from_container(app_container, task_obj)
 
         remove_container(app_container)
-        self.update_state(state="SUCCESS", meta=populate_meta_info(None))
+        meta = populate_meta_info(None)
+        meta["inputs"] = task_obj.input_timings
+        meta["outputs"] = outputs
+        meta["docker_calls"] = docker_client.stop_collecting()
+        self.update_state(state="SUCCESS", meta=meta)
+        # the return value replaces the meta once the task has finished
+        return meta
     else:
-        self.update_state(state="FAILURE", meta=populate_meta_info(app_container.id))
+        meta = populate_meta_info(app_container)
+        meta["inputs"] = task_obj.input_timings
+        meta["docker_calls"] = docker_client.stop_collecting()
+        self.update_state(state="FAILURE", meta=meta)
 
 
         # TODO: clean up and make proper status updates
 
 
-def populate_meta_info(container_id):
-    if not container_id is None:
-        c = get_docker_container(container_id)
+def run_in_warm_container(task, task_obj, app_image):
+    # same steps as above, but the invocation is exec'd in a pooled container
+    # that was started before and goes back to the pool afterwards, inputs are
+    # always copied as the mounts of a container are fixed when it is created
+    config = current_app.config
+    container = warm_pool.acquire(app_image)
+    healthy = False
+    outputs = []
+    try:
+        meta = populate_meta_info(container)
+        meta["warm"] = True
+        task.update_state(state="PROGRESS", meta=meta)
+
+        copy_inputs_to_container(container, task_obj)
+        exit_code = warm_pool.run(container, shlex.split(task_obj.invocation_cmd))
+        if exit_code == 0:
+            outputs = copy_outputs_from_container(container, task_obj)
+        healthy = True
+    finally:
+        warm_pool.release(container, app_image, config["WARM_POOL_MAX_PER_IMAGE"],
+                          config["WARM_POOL_IDLE_TIMEOUT"], healthy)
+
+    meta = {"container_id": container.id, "container_status": "RELEASED", "warm": True,
+            "exit_code": exit_code, "inputs": task_obj.input_timings, "outputs": outputs,
+            "docker_calls": docker_client.stop_collecting()}
+    if exit_code == 0:
+        task.update_state(state="SUCCESS", meta=meta)
+        return meta
+    else:
+        task.update_state(state="FAILURE", meta=meta)
+
+
+def populate_meta_info(container_obj):
+    if not container_obj is None:
+        # refreshes the status of the container object already at hand
+        c = container_obj
+        docker_client.call("containers.reload", lambda client: c.reload(), retries=1)
 
         return {
             "container_id": c.id,
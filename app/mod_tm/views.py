@@ -1,5 +1,5 @@
 from flask import Blueprint, request, abort, jsonify
-from app.mod_tm import task_processor
+from app.mod_tm import task_processor, docker_client
 
 # Define the blueprint: 'tm'
 mod_tm = Blueprint('tm', __name__)
@@ -30,6 +30,9 @@ def get_task_by_id(task_id):
             'container_id': task.info.get('container_id', ''),
             'container_status': task.info.get('container_status', '')
         }
+        for key in ('inputs', 'docker_calls', 'outputs'):
+            if key in task.info:
+                response[key] = task.info[key]
     else:
         # something went wrong in the background job
         response = {
@@ -41,3 +44,8 @@ def get_task_by_id(task_id):
 
     return jsonify(response)
 
+
+@mod_tm.route('/admin/docker')
+def get_docker_stats():
+    # latency of the Docker API calls made by this process
+    return jsonify(docker_client.get_stats())
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+import docker
+from app.mod_tm import docker_client
+
+# Pre-started containers per image that run invocations through exec instead of a
+# container of their own. An idle container only sleeps. Before every invocation
+# the app folder is restored from the copy taken when the container was started,
+# so each invocation sees a fresh ${APPHOME} with the same input and output paths
+# as in a new container. Pools are per worker process, so the bound per image holds
+# for each process and not for the worker as a whole. Idle containers are removed
+# by a timer after a timeout, also when no further task arrives.
+
+LABEL = "hdtapps.warm-pool"
+PRISTINE_APP_DIR = "/tmp/.hdtapps-pristine-app"
+IDLE_COMMAND = ["sh", "-c", "trap 'exit 0' TERM; while true; do sleep 3600 & wait $!; done"]
+SNAPSHOT_COMMAND = ["sh", "-c", 'rm -rf ' + PRISTINE_APP_DIR + ' && cp -a "$APPHOME" ' + PRISTINE_APP_DIR]
+RESTORE_COMMAND = ["sh", "-c", 'rm -rf "$APPHOME" && cp -a ' + PRISTINE_APP_DIR + ' "$APPHOME"']
+# runs the invocation in the app folder like the CMD of a new container would
+RUN_PREFIX = ["sh", "-c", 'cd "$APPHOME" && exec "$@"', "sh"]
+
+_pools = {}
+_lock = threading.Lock()
+_timer = None
+
+
+class WarmContainerError(Exception):
+    pass
+
+
+def acquire(image):
+    # a prepared container of the image, reused from the pool if possible
+    with _lock:
+        pool = _pools.get(image.id)
+        entry = pool.pop() if pool else None
+
+    if entry is not None:
+        container = entry[0]
+        try:
+            check_exec(container, RESTORE_COMMAND)
+            return container
+        except Exception as e:
+            print("discarding warm container", container.id, e)
+            remove(container)
+
+    return start_container(image)
+
+
+def start_container(image):
+    container = docker_client.call("containers.create", lambda c: c.containers.create(
+        image, IDLE_COMMAND, labels={LABEL: str(os.getpid())}))
+    try:
+        docker_client.call("containers.start", lambda c: container.start())
+        check_exec(container, SNAPSHOT_COMMAND)
+    except Exception:
+        remove(container)
+        raise
+
+    return container
+
+
+def release(container, image, max_per_image, max_idle, healthy=True):
+    evict_idle(max_idle)
+    if healthy:
+        with _lock:
+            pool = _pools.setdefault(image.id, [])
+            if len(pool) < max_per_image:
+                pool.append((container, time.monotonic()))
+                schedule_eviction(max_idle)
+                return
+    remove(container)
+
+
+def schedule_eviction(max_idle):
+    # call with _lock held, one timer per process runs while containers are idle
+    global _timer
+    if _timer is None:
+        _timer = threading.Timer(max_idle, run_eviction, [max_idle])
+        _timer.daemon = True
+        _timer.start()
+
+
+def run_eviction(max_idle):
+    global _timer
+    with _lock:
+        _timer = None
+    evict_idle(max_idle)
+    with _lock:
+        if any(_pools.values()):
+            schedule_eviction(max_idle)
+
+
+def run(container, argv, poll_interval=0.01, max_poll_interval=0.5):
+    # the exec is detached and polled, a long silent invocation would otherwise
+    # run into the read timeout of the API client
+    exec_id = docker_client.call("exec_create", lambda c: c.api.exec_create(container.id, RUN_PREFIX + argv))
+    docker_client.call("exec_start", lambda c: c.api.exec_start(exec_id, detach=True))
+    while True:
+        info = docker_client.call("exec_inspect", lambda c: c.api.exec_inspect(exec_id), retries=1)
+        if not info["Running"]:
+            return info["ExitCode"]
+        time.sleep(poll_interval)
+        poll_interval = min(poll_interval * 2, max_poll_interval)
+
+
+def check_exec(container, argv):
+    exit_code = run(container, argv)
+    if exit_code != 0:
+        raise WarmContainerError("%s exited with %s" % (" ".join(argv), exit_code))
+
+
+def evict_idle(max_idle):
+    now = time.monotonic()
+    expired = []
+    with _lock:
+        for image_id, pool in _pools.items():
+            keep = [(c, t) for c, t in pool if now - t <= max_idle]
+            expired.extend(c for c, t in pool if now - t > max_idle)
+            _pools[image_id] = keep
+    for container in expired:
+        remove(container)
+
+
+def drain():
+    global _timer
+    with _lock:
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+        containers = [c for pool in _pools.values() for c, t in pool]
+        _pools.clear()
+    for container in containers:
+        remove(container)
+
+
+def remove(container):
+    try:
+        docker_client.call("containers.remove", lambda c: container.remove(v=True, force=True))
+    except docker.errors.NotFound:
+        pass
+    except Exception as e:
+        print("warm container could not be removed", container.id, e)
+
+
+def get_stats():
+    with _lock:
+        return {image_id: len(pool) for image_id, pool in _pools.items()}
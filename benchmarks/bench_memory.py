@@ -0,0 +1,38 @@
+# Memory footprint of a synthetic catalogue of specification objects.
+# Run from the project's folder: python -m benchmarks.bench_memory [transformations]
+import gc
+import sys
+import time
+import tracemalloc
+from app.mod_repo.models import dict_to_app_pkg_spec_object
+from benchmarks.synthetic import make_spec
+
+TRANSFORMATIONS_PER_APP = 100
+
+
+def load_catalogue(transformations):
+    apps = transformations // TRANSFORMATIONS_PER_APP
+    docs = [make_spec(transformations=TRANSFORMATIONS_PER_APP, test_runs=TRANSFORMATIONS_PER_APP, app_index=i)
+            for i in range(apps)]
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    catalogue = [dict_to_app_pkg_spec_object(d) for d in docs]
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return catalogue, current, peak, elapsed
+
+
+def main():
+    transformations = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    catalogue, current, peak, elapsed = load_catalogue(transformations)
+    print("%d apps, %d transformations loaded in %.2f s" % (len(catalogue), transformations, elapsed))
+    print("retained %.1f MiB (%.0f bytes per transformation incl. its test run), peak %.1f MiB" %
+          (current / 2 ** 20, current / transformations, peak / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+# Compares the former JSON round trip through the isinstance-chain encoder
+# against the direct to_dict() conversion.
+# Run from the project's folder: python -m benchmarks.bench_to_dict
+import json
+import timeit
+from app.mod_repo.models import dict_to_app_pkg_spec_object
+from benchmarks.former_encoder import FormerApplicationSpecJsonEncoder
+from benchmarks.synthetic import make_spec
+
+
+def round_trip(spec):
+    return json.loads(json.dumps(spec, cls=FormerApplicationSpecJsonEncoder))
+
+
+def main():
+    for size in (10, 100, 1000):
+        spec = dict_to_app_pkg_spec_object(make_spec(transformations=size, test_runs=size))
+        number = max(1, 2000 // size)
+        t_round_trip = timeit.timeit(lambda: round_trip(spec), number=number) / number
+        t_direct = timeit.timeit(spec.to_dict, number=number) / number
+        t_json = timeit.timeit(spec.to_json_str, number=number) / number
+        print("%5d transformations/test runs: round trip %.2f ms, to_dict %.2f ms (%.1fx), to_json_str %.2f ms" %
+              (size, t_round_trip * 1000, t_direct * 1000, t_round_trip / t_direct, t_json * 1000))
+
+
+if __name__ == '__main__':
+    main()
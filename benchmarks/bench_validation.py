@@ -0,0 +1,23 @@
+# Validation and construction of large specifications, compared with the
+# hand-written validating constructors the schema replaced.
+# Run from the project's folder: python -m benchmarks.bench_validation
+import timeit
+from app.mod_repo import spec_validator
+from app.mod_repo.models import dict_to_app_pkg_spec_object
+from benchmarks import former_models
+from benchmarks.synthetic import make_spec
+
+
+def main():
+    for size in (10, 100, 1000):
+        spec = make_spec(transformations=size, test_runs=size)
+        number = max(1, 2000 // size)
+        t_former = timeit.timeit(lambda: former_models.dict_to_app_pkg_spec_object(spec), number=number) / number
+        t_validate = timeit.timeit(lambda: spec_validator.validate(spec), number=number) / number
+        t_total = timeit.timeit(lambda: dict_to_app_pkg_spec_object(spec), number=number) / number
+        print("%5d transformations/test runs: former constructors %.2f ms, validate %.2f ms, "
+              "validate and build %.2f ms" % (size, t_former * 1000, t_validate * 1000, t_total * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+# The isinstance-chain JSON encoder the models used before they had to_dict(),
+# kept for benchmarks/bench_to_dict.py only.
+import json
+from app.mod_repo.models import ApplicationSpecification, Description, Transformation, InputParameter, \
+    InputFile, InputFileSet, OutputFile, DependencySpec, EnvironmentDependency, SoftwareDependency, FileDependency, \
+    Configuration, InvocationCLI, TestRun, SampleInputParameter, SampleInputFile, SampleInputFileSet, SampleOutputFile
+
+
+class FormerApplicationSpecJsonEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, ApplicationSpecification):
+            return {
+                "appInfo": o.app_info,
+                "transformations": o.t_specs,
+                "dependencies": o.dep_specs,
+                "configs": o.config_specs,
+                "invocations": o.invocations,
+                "testRuns": o.test_run_specs
+            }
+
+        if isinstance(o, Description):
+            return {
+                "appID": o.id,
+                "appName": o.name,
+                "appVersion": o.version,
+                "appPublisher": o.publisher,
+                "appDesc": o.desc,
+                "appDevelopers": o.developers,
+                "appLicense": o.license,
+                "tags": o.tags,
+                "providers": o.providers,
+                "isValidated": o.is_validated,
+                "path": o.path,
+                "transformationsCount": o.transformations_count,
+                "totalDepsCount": o.total_deps_count,
+                "envDepsCount": o.env_deps_count,
+                "softDepsCount": o.soft_deps_count,
+                "fileDepsCount": o.file_deps_count
+            }
+
+        if isinstance(o, InputParameter):
+            return {
+                "inputName": o.name,
+                "alias": o.alias,
+                "isOptional": o.is_optional,
+                "value": o.value,
+                "type": o.type
+            }
+
+        if isinstance(o, InputFile):
+            return {
+                "inputName": o.name,
+                "alias": o.alias,
+                "isOptional": o.is_optional,
+                "format": o.format,
+                "schema": o.schema,
+                "requiredPath": o.req_path
+            }
+
+        if isinstance(o, InputFileSet):
+            return {
+                "inputName": o.name,
+                "alias": o.alias,
+                "isOptional": o.is_optional,
+                "format": o.format,
+                "schema": o.schema,
+                "requiredPath": o.req_path,
+                "fileSetSize": o.size
+            }
+
+        if isinstance(o, OutputFile):
+            return {
+                "outputName": o.name,
+                "alias": o.alias,
+                "format": o.format,
+                "schema": o.schema,
+                "accessPath": o.access_path
+            }
+
+        if isinstance(o, Transformation):
+            return {
+                "transformationID": o.id,
+                "appID": o.app_id,
+                "name": o.name,
+                "qname": o.qname,
+                "strictSignature": o.strict_signature,
+                "relaxedSignature": o.relaxed_signature,
+                "strictSignatureDigest": o.strict_signature_digest,
+                "relaxedSignatureDigest": o.relaxed_signature_digest,
+                "providers": o.providers,
+                "inputParams": o.i_params,
+                "inputFiles": o.i_files,
+                "inputFileSets": o.i_filesets,
+                "outputFiles": o.o_files,
+                "inputParamCount": o.i_params_count,
+                "inputStrParamCount": o.i_str_param_count,
+                "inputNumParamCount": o.i_num_param_count,
+                "inputOptParamCount": o.i_opt_param_count,
+                "inputFilesCount": o.i_files_count,
+                "inputFileSetsCount": o.i_filesets_count,
+                "outputFilesCount": o.o_files_count
+            }
+
+        if isinstance(o, DependencySpec):
+            return {
+                "envDeps": o.env_deps,
+                "softDeps": o.soft_deps,
+                "fileDeps": o.file_deps
+            }
+
+        if isinstance(o, EnvironmentDependency):
+            return {
+                "depName": o.name,
+                "alias": o.alias,
+                "depDesc": o.desc,
+                "value": o.value
+            }
+
+        if isinstance(o, SoftwareDependency):
+            return {
+                "depName": o.name,
+                "alias": o.alias,
+                "depDesc": o.desc,
+                "depVersion": o.version,
+                "depPath": o.path,
+                "commands": o.commands
+            }
+
+        if isinstance(o, FileDependency):
+            return {
+                "depName": o.name,
+                "alias": o.alias,
+                "depDesc": o.desc,
+                "filePath": o.path
+            }
+
+        if isinstance(o, Configuration):
+            return {
+                "confName": o.name,
+                "commands": o.commands
+            }
+
+        if isinstance(o, InvocationCLI):
+            return {
+                "invName": o.name,
+                "invDesc": o.desc,
+                "command": o.command
+            }
+
+        if isinstance(o, TestRun):
+            return {
+                "name": o.name,
+                "description": o.desc,
+                "transformation": o.transformation_name,
+                "sampleInputParams": o.sample_input_params,
+                "sampleInputFiles": o.sample_input_files,
+                "sampleInputFileSets": o.sample_input_filesets,
+                "resultingOutputFiles": o.sample_output_files
+            }
+
+        if isinstance(o, SampleInputParameter):
+            return {
+                "alias": o.alias,
+                "value": o.value
+            }
+
+        if isinstance(o, SampleInputFile):
+            return {
+                "alias": o.alias,
+                "accessPath": o.access_path
+            }
+
+        if isinstance(o, SampleInputFileSet):
+            return {
+                "alias": o.alias,
+                "accessPath": o.access_path
+            }
+
+        if isinstance(o, SampleOutputFile):
+            return {
+                "alias": o.alias,
+                "outputPath": o.output_path
+            }
+
+        else:
+            raise TypeError("Type not serializable")
@@ -0,0 +1,1035 @@
+# Snapshot of app/mod_repo/models.py before the declarative schema validator,
+# whose constructors validated the specification themselves. Kept for
+# benchmarks/bench_validation.py only, do not use it in the application.
+
+import json
+import traceback
+from itertools import starmap
+from typing import List
+from app.mod_repo.signature_index import count_by_format, encode_signature, signature_digest
+
+
+class ApplicationSpecification:
+    __slots__ = ("app_info", "t_specs", "dep_specs", "config_specs", "invocations", "test_run_specs")
+
+    def __init__(self, desc_entity, transformations, dependencies, configurations, invocations, test_runs):
+
+        self.app_info = desc_entity         # type: Description
+        self.t_specs = transformations      # type: List[Transformation]
+        self.dep_specs = dependencies       # type: DependencySpec
+        self.config_specs = configurations  # type: List[Configuration]
+        self.invocations = invocations  # type: List[InvocationCLI]
+        self.test_run_specs = test_runs     # type: List[TestRun]
+
+        for t in self.t_specs:
+            t.app_id = self.app_info.id
+
+        self.app_info.transformations_count = len(self.t_specs)
+        self.app_info.env_deps_count = len(self.dep_specs.env_deps)
+        self.app_info.soft_deps_count = len(self.dep_specs.soft_deps)
+        self.app_info.file_deps_count = len(self.dep_specs.file_deps)
+
+        self.app_info.total_deps_count = self.app_info.env_deps_count + self.app_info.soft_deps_count + self.app_info.file_deps_count
+
+    def to_json_str(self):
+        return json.dumps(self.to_dict())
+
+    def to_dict(self):
+        return {
+            "appInfo": self.app_info.to_dict(),
+            "transformations": [t.to_dict() for t in self.t_specs],
+            "dependencies": self.dep_specs.to_dict(),
+            "configs": [c.to_dict() for c in self.config_specs],
+            "invocations": [i.to_dict() for i in self.invocations],
+            "testRuns": [tr.to_dict() for tr in self.test_run_specs]
+        }
+
+
+class Description:
+    __slots__ = (
+        "name", "developers", "publisher", "version", "desc", "license", "tags", "id", "providers",
+        "is_validated", "path", "transformations_count", "total_deps_count", "env_deps_count",
+        "soft_deps_count", "file_deps_count"
+    )
+
+    def __init__(self, app_info):
+        if "appName" in app_info:
+            if is_not_blank(app_info["appName"]):
+                self.name = app_info["appName"]
+            else:
+                raise EmptyProperty("appInfo.appName")
+        else:
+            raise PropertyNotSpecified("appInfo.appName")
+
+        if "appDevelopers" in app_info:
+            if len(app_info["appDevelopers"]) > 0:
+                self.developers = app_info["appDevelopers"]
+            else:
+                raise EmptyProperty("appInfo.appDevelopers")
+        else:
+            raise PropertyNotSpecified("appInfo.appDevelopers")
+
+        if "appPublisher"in app_info:
+            if is_not_blank(app_info["appPublisher"]):
+                self.publisher = app_info["appPublisher"]
+            else:
+                raise EmptyProperty("appInfo.appPublisher")
+        else:
+            raise PropertyNotSpecified("appInfo.appPublisher")
+
+        if "appVersion" in app_info:
+            if is_not_blank(app_info["appVersion"]):
+                self.version = app_info["appVersion"]
+            else:
+                raise EmptyProperty("appInfo.appVersion")
+        else:
+            raise PropertyNotSpecified("appInfo.appVersion")
+
+        if "appDesc" in app_info:
+            self.desc = app_info["appDesc"]
+        else:
+            self.desc = ""
+
+        if "appLicense" in app_info:
+            self.license = app_info["appLicense"]
+        else:
+            self.license = ""
+
+        if "tags" in app_info:
+            self.tags = app_info["tags"]
+        else:
+            self.tags = []
+
+        self.id = self.__generate_app_id()
+        self.providers = []
+        self.is_validated = False
+        self.path = ""
+        self.transformations_count = 0
+        self.total_deps_count = 0
+        self.env_deps_count = 0
+        self.soft_deps_count = 0
+        self.file_deps_count = 0
+
+    def __generate_app_id(self):
+        pub = self.publisher.lower().replace(" ", "")
+        name = self.name.lower().replace(" ", "")
+        ver = self.version.lower().replace(" ", "")
+        dev_str = ""
+        for dev in self.developers:
+            shortened_dev_string = ""
+            parts = dev.split()
+            for part in parts:
+                shortened_dev_string += part[0]
+                shortened_dev_string += part[-1]
+            dev_str += shortened_dev_string.lower()
+
+        return pub + "_" + dev_str + "_" + name + "_" + ver
+
+    def to_dict(self):
+        return {
+            "appID": self.id,
+            "appName": self.name,
+            "appVersion": self.version,
+            "appPublisher": self.publisher,
+            "appDesc": self.desc,
+            "appDevelopers": list(self.developers),
+            "appLicense": self.license,
+            "tags": list(self.tags),
+            "providers": [dict(p) for p in self.providers],
+            "isValidated": self.is_validated,
+            "path": self.path,
+            "transformationsCount": self.transformations_count,
+            "totalDepsCount": self.total_deps_count,
+            "envDepsCount": self.env_deps_count,
+            "softDepsCount": self.soft_deps_count,
+            "fileDepsCount": self.file_deps_count
+        }
+
+
+class Transformation:
+    __slots__ = (
+        "name", "qname", "id", "app_id", "relaxed_signature", "strict_signature",
+        "relaxed_signature_digest", "strict_signature_digest", "providers", "i_str_param_count",
+        "i_num_param_count", "i_opt_param_count", "i_params", "i_params_count", "i_files", "i_files_count",
+        "i_filesets", "i_filesets_count", "o_files", "o_files_count"
+    )
+
+    def __init__(self, t_obj):
+        if "name" in t_obj:
+            if is_not_blank(t_obj["name"]):
+                self.name = t_obj["name"]
+            else:
+                raise EmptyProperty("transformation.name")
+        else:
+            raise PropertyNotSpecified("transformation.name")
+
+        if "qname" in t_obj:
+            self.qname = t_obj["qname"]
+        else:
+            self.qname = ""
+        self.id = ""
+        self.app_id = ""
+        self.relaxed_signature = ""
+        self.strict_signature = ""
+        self.relaxed_signature_digest = ""
+        self.strict_signature_digest = ""
+        self.providers = []
+        self.i_str_param_count = 0
+        self.i_num_param_count = 0
+        self.i_opt_param_count = 0
+        self.i_params = []  # type: List[InputParameter]
+        if "inputParams" in t_obj:
+            for p in t_obj["inputParams"]:
+                try:
+                    input_param = InputParameter(p)
+                    self.i_params.append(input_param)
+                    if input_param.type == "string" or input_param.type == "string":
+                        self.i_str_param_count += 1
+                    else:
+                        self.i_num_param_count += 1
+
+                    if input_param.is_optional:
+                        self.i_opt_param_count += 1
+                except EmptyProperty as e:
+                    print('EmptyProperty exception:', e.msg)
+                except PropertyNotSpecified as er:
+                    print('PropertyNotSpecified exception:', er.msg)
+        self.i_params_count = len(self.i_params)
+
+        self.i_files = []   # type: List[InputFile]
+        if "inputFiles" in t_obj:
+            for f in t_obj["inputFiles"]:
+                try:
+                    input_file = InputFile(f)
+                    self.i_files.append(input_file)
+                except EmptyProperty as e:
+                    print('EmptyProperty exception:', e.msg)
+                except PropertyNotSpecified as er:
+                    print('PropertyNotSpecified exception:', er.msg)
+        self.i_files_count = len(self.i_files)
+
+        self.i_filesets = []    # type: List[InputFileSet]
+        if "inputFileSets" in t_obj:
+            for f in t_obj["inputFileSets"]:
+                try:
+                    input_fileset = InputFileSet(f)
+                    self.i_filesets.append(input_fileset)
+                except EmptyProperty as e:
+                    print('EmptyProperty exception:', e.msg)
+                except PropertyNotSpecified as er:
+                    print('PropertyNotSpecified exception:', er.msg)
+        self.i_filesets_count = len(self.i_filesets)
+
+        if self.i_params_count + self.i_files_count + self.i_filesets_count == 0:
+            raise EmptyProperty("transformation.inputs")
+
+        self.o_files = []   # type: List[OutputFile]
+        if "outputFiles" in t_obj:
+            for f in t_obj["outputFiles"]:
+                try:
+                    output_file = OutputFile(f)
+                    self.o_files.append(output_file)
+                except EmptyProperty as e:
+                    print('EmptyProperty exception:', e.msg)
+                except PropertyNotSpecified as er:
+                    print('PropertyNotSpecified exception:', er.msg)
+        self.o_files_count = len(self.o_files)
+
+        if self.o_files_count == 0:
+            raise EmptyProperty("transformation.outputs")
+
+        # Generate transformation's signatures
+        self.__generate_signatures()
+
+    def __generate_signatures(self):
+        relaxed_param_number = self.i_params_count - self.i_opt_param_count
+        outfiles = count_by_format([o.format for o in self.o_files])
+
+        self.strict_signature = encode_signature(
+            self.i_params_count,
+            count_by_format([f.format for f in self.i_files]),
+            count_by_format([fs.format for fs in self.i_filesets]),
+            outfiles
+        )
+        self.relaxed_signature = encode_signature(
+            relaxed_param_number,
+            count_by_format([f.format for f in self.i_files if not f.is_optional]),
+            count_by_format([fs.format for fs in self.i_filesets if not fs.is_optional]),
+            outfiles
+        )
+        self.strict_signature_digest = signature_digest(self.strict_signature)
+        self.relaxed_signature_digest = signature_digest(self.relaxed_signature)
+
+    @staticmethod
+    def generate_signature(pnum: int, infiles: List[str], infilesets: List[str], outfiles: List[str]) -> str:
+        return encode_signature(pnum, count_by_format(infiles), count_by_format(infilesets), count_by_format(outfiles))
+
+    def to_json_str(self):
+        return json.dumps(self.to_dict())
+
+    def to_dict(self):
+        return {
+            "transformationID": self.id,
+            "appID": self.app_id,
+            "name": self.name,
+            "qname": self.qname,
+            "strictSignature": self.strict_signature,
+            "relaxedSignature": self.relaxed_signature,
+            "strictSignatureDigest": self.strict_signature_digest,
+            "relaxedSignatureDigest": self.relaxed_signature_digest,
+            "providers": [dict(p) for p in self.providers],
+            "inputParams": [p.to_dict() for p in self.i_params],
+            "inputFiles": [f.to_dict() for f in self.i_files],
+            "inputFileSets": [fs.to_dict() for fs in self.i_filesets],
+            "outputFiles": [o.to_dict() for o in self.o_files],
+            "inputParamCount": self.i_params_count,
+            "inputStrParamCount": self.i_str_param_count,
+            "inputNumParamCount": self.i_num_param_count,
+            "inputOptParamCount": self.i_opt_param_count,
+            "inputFilesCount": self.i_files_count,
+            "inputFileSetsCount": self.i_filesets_count,
+            "outputFilesCount": self.o_files_count
+        }
+
+
+class InputParameter:
+    __slots__ = ("name", "alias", "type", "is_optional", "value")
+
+    def __init__(self, param):
+        if "inputName" in param:
+            if is_not_blank(param["inputName"]):
+                self.name = param["inputName"]
+            else:
+                raise EmptyProperty("inputParam.inputName")
+        else:
+            raise PropertyNotSpecified("inputParam.inputName")
+
+        if "alias" in param:
+            if is_not_blank(param["alias"]):
+                self.alias = param["alias"]
+            else:
+                raise EmptyProperty("inputParam.alias")
+        else:
+            raise PropertyNotSpecified("inputParam.alias")
+
+        if "type" in param:
+            if is_not_blank(param["type"]):
+                self.type = param["type"]
+            else:
+                raise EmptyProperty("inputParam.type")
+        else:
+            raise PropertyNotSpecified("inputParam.type")
+
+        if "isOptional" in param:
+            self.is_optional = param["isOptional"]
+        else:
+            self.is_optional = True
+
+        if "value" in param:
+            self.value = param["value"]
+        else:
+            self.value = ""
+
+    def to_dict(self):
+        return {
+            "inputName": self.name,
+            "alias": self.alias,
+            "isOptional": self.is_optional,
+            "value": self.value,
+            "type": self.type
+        }
+
+
+class InputFile:
+    __slots__ = ("name", "alias", "format", "is_optional", "schema", "req_path")
+
+    def __init__(self, file):
+        if "inputName" in file:
+            if is_not_blank(file["inputName"]):
+                self.name = file["inputName"]
+            else:
+                raise EmptyProperty("inputFile.inputName")
+        else:
+            raise PropertyNotSpecified("inputFile.inputName")
+
+        if "alias" in file:
+            if is_not_blank(file["alias"]):
+                self.alias = file["alias"]
+            else:
+                raise EmptyProperty("inputFile.alias")
+        else:
+            raise PropertyNotSpecified("inputFile.alias")
+
+        if "format" in file:
+            if is_not_blank(file["format"]):
+                self.format = file["format"]
+            else:
+                raise EmptyProperty("inputFile.format")
+        else:
+            raise PropertyNotSpecified("inputFile.format")
+
+        if "isOptional" in file:
+            self.is_optional = file["isOptional"]
+        else:
+            self.is_optional = True
+
+        if "schema" in file:
+            self.schema = file["schema"]
+        else:
+            self.schema = ""
+
+        if "requiredPath" in file:
+            self.req_path = file["requiredPath"]
+        else:
+            self.req_path = ""
+
+    def to_dict(self):
+        return {
+            "inputName": self.name,
+            "alias": self.alias,
+            "isOptional": self.is_optional,
+            "format": self.format,
+            "schema": self.schema,
+            "requiredPath": self.req_path
+        }
+
+
+class InputFileSet:
+    __slots__ = ("name", "alias", "format", "req_path", "is_optional", "schema", "size")
+
+    def __init__(self, fileset):
+        if "inputName" in fileset:
+            if is_not_blank(fileset["inputName"]):
+                self.name = fileset["inputName"]
+            else:
+                raise EmptyProperty("inputFileSet.inputName")
+        else:
+            raise PropertyNotSpecified("inputFileSet.inputName")
+
+        if "alias" in fileset:
+            if is_not_blank(fileset["alias"]):
+                self.alias = fileset["alias"]
+            else:
+                raise EmptyProperty("inputFileSet.alias")
+        else:
+            raise PropertyNotSpecified("inputFileSet.alias")
+
+        if "format" in fileset:
+            if is_not_blank(fileset["format"]):
+                self.format = fileset["format"]
+            else:
+                raise EmptyProperty("inputFileSet.format")
+        else:
+            raise PropertyNotSpecified("inputFileSet.format")
+
+        if "requiredPath" in fileset:
+            if is_not_blank(fileset["requiredPath"]):
+                self.req_path = fileset["requiredPath"]
+            else:
+                raise EmptyProperty("inputFileSet.requiredPath")
+        else:
+            raise PropertyNotSpecified("inputFileSet.requiredPath")
+
+        if "isOptional" in fileset:
+            self.is_optional = fileset["isOptional"]
+        else:
+            self.is_optional = True
+
+        if "schema" in fileset:
+            self.schema = fileset["schema"]
+        else:
+            self.schema = ""
+
+        if "fileSetSize" in fileset:
+            self.size = fileset["fileSetSize"]
+        else:
+            self.size = -1
+
+    def to_dict(self):
+        return {
+            "inputName": self.name,
+            "alias": self.alias,
+            "isOptional": self.is_optional,
+            "format": self.format,
+            "schema": self.schema,
+            "requiredPath": self.req_path,
+            "fileSetSize": self.size
+        }
+
+
+class OutputFile:
+    __slots__ = ("name", "alias", "format", "access_path", "schema")
+
+    def __init__(self, file):
+        if "outputName" in file:
+            if is_not_blank(file["outputName"]):
+                self.name = file["outputName"]
+            else:
+                raise EmptyProperty("outputFile.outputName")
+        else:
+            raise PropertyNotSpecified("outputFile.outputName")
+
+        if "alias" in file:
+            if is_not_blank(file["alias"]):
+                self.alias = file["alias"]
+            else:
+                raise EmptyProperty("outputFile.alias")
+        else:
+            raise PropertyNotSpecified("outputFile.alias")
+
+        if "format" in file:
+            if is_not_blank(file["format"]):
+                self.format = file["format"]
+            else:
+                raise EmptyProperty("outputFile.format")
+        else:
+            raise PropertyNotSpecified("outputFile.format")
+
+        if "accessPath" in file:
+            if is_not_blank(file["accessPath"]):
+                self.access_path = file["accessPath"]
+            else:
+                raise EmptyProperty("outputFile.accessPath")
+        else:
+            raise PropertyNotSpecified("outputFile.accessPath")
+
+        if "schema"in file:
+            self.schema = file["schema"]
+        else:
+            self.schema = ""
+
+    def to_dict(self):
+        return {
+            "outputName": self.name,
+            "alias": self.alias,
+            "format": self.format,
+            "schema": self.schema,
+            "accessPath": self.access_path
+        }
+
+
+class DependencySpec:
+    __slots__ = ("env_deps", "soft_deps", "file_deps")
+
+    def __init__(self, dep_obj):
+        self.env_deps = []      # type: List[EnvironmentDependency]
+        if "envDeps" in dep_obj:
+            for ed in dep_obj["envDeps"]:
+                try:
+                    env_dep = EnvironmentDependency(ed)
+                    self.env_deps.append(env_dep)
+                except EmptyProperty as e:
+                    print('EmptyProperty exception:', e.msg)
+                except PropertyNotSpecified as er:
+                    print('PropertyNotSpecified exception:', er.msg)
+
+        self.soft_deps = []     # type: List[SoftwareDependency]
+        if "softDeps" in dep_obj:
+            for sd in dep_obj["softDeps"]:
+                try:
+                    soft_dep = SoftwareDependency(sd)
+                    self.soft_deps.append(soft_dep)
+                except EmptyProperty as e:
+                    print('EmptyProperty exception:', e.msg)
+                except PropertyNotSpecified as er:
+                    print('PropertyNotSpecified exception:', er.msg)
+
+        self.file_deps = []     # type: List[FileDependency]
+        if "fileDeps" in dep_obj:
+            for fd in dep_obj["fileDeps"]:
+                try:
+                    file_dep = FileDependency(fd)
+                    self.file_deps.append(file_dep)
+                except EmptyProperty as e:
+                    print('EmptyProperty exception: ', e.msg)
+                except PropertyNotSpecified as er:
+                    print('PropertyNotSpecified exception: ', er.msg)
+
+    def to_dict(self):
+        return {
+            "envDeps": [d.to_dict() for d in self.env_deps],
+            "softDeps": [d.to_dict() for d in self.soft_deps],
+            "fileDeps": [d.to_dict() for d in self.file_deps]
+        }
+
+
+class EnvironmentDependency:
+    __slots__ = ("name", "alias", "value", "desc")
+
+    def __init__(self, env_dep_obj):
+        if "depName" in env_dep_obj:
+            if is_not_blank(env_dep_obj["depName"]):
+                self.name = env_dep_obj["depName"]
+            else:
+                raise EmptyProperty("envDep.depName")
+        else:
+            raise PropertyNotSpecified("envDep.depName")
+
+        if "alias" in env_dep_obj:
+            if is_not_blank(env_dep_obj["alias"]):
+                self.alias = env_dep_obj["alias"]
+            else:
+                raise EmptyProperty("envDep.alias")
+        else:
+            raise PropertyNotSpecified("envDep.alias")
+
+        if "value" in env_dep_obj:
+            if is_not_blank(env_dep_obj["value"]):
+                self.value = env_dep_obj["value"]
+            else:
+                raise EmptyProperty("envDep.value")
+        else:
+            raise PropertyNotSpecified("envDep.value")
+
+        if "depDesc" in env_dep_obj:
+            self.desc = env_dep_obj["depDesc"]
+        else:
+            self.desc = ""
+
+    def to_dict(self):
+        return {
+            "depName": self.name,
+            "alias": self.alias,
+            "depDesc": self.desc,
+            "value": self.value
+        }
+
+
+class SoftwareDependency:
+    __slots__ = ("name", "alias", "commands", "desc", "version", "path")
+
+    def __init__(self, soft_dep_obj):
+        if "depName" in soft_dep_obj:
+            if is_not_blank(soft_dep_obj["depName"]):
+                self.name = soft_dep_obj["depName"]
+            else:
+                raise EmptyProperty("softDep.depName")
+        else:
+            raise PropertyNotSpecified("softDep.depName")
+
+        if "alias" in soft_dep_obj:
+            if is_not_blank(soft_dep_obj["alias"]):
+                self.alias = soft_dep_obj["alias"]
+            else:
+                raise EmptyProperty("softDep.alias")
+        else:
+            raise PropertyNotSpecified("softDep.alias")
+
+        if "commands" in soft_dep_obj:
+            if len(soft_dep_obj["commands"]) > 0:
+                self.commands = soft_dep_obj["commands"]
+            else:
+                raise EmptyProperty("softDep.commands")
+        else:
+            raise PropertyNotSpecified("softDep.commands")
+
+        if "depDesc" in soft_dep_obj:
+            self.desc = soft_dep_obj["depDesc"]
+        else:
+            self.desc = ""
+
+        if "depVersion" in soft_dep_obj:
+            self.version = soft_dep_obj["depVersion"]
+        else:
+            self.version = ""
+
+        if "depPath" in soft_dep_obj:
+            self.path = soft_dep_obj["depPath"]
+        else:
+            self.path = ""
+
+    def to_dict(self):
+        return {
+            "depName": self.name,
+            "alias": self.alias,
+            "depDesc": self.desc,
+            "depVersion": self.version,
+            "depPath": self.path,
+            "commands": list(self.commands)
+        }
+
+
+class FileDependency:
+    __slots__ = ("name", "alias", "path", "desc")
+
+    def __init__(self, file_dep_obj):
+        if "depName" in file_dep_obj:
+            if is_not_blank(file_dep_obj["depName"]):
+                self.name = file_dep_obj["depName"]
+            else:
+                raise EmptyProperty("fileDep.depName")
+        else:
+            raise PropertyNotSpecified("fileDep.depName")
+
+        if "alias" in file_dep_obj:
+            if is_not_blank(file_dep_obj["alias"]):
+                self.alias = file_dep_obj["alias"]
+            else:
+                raise EmptyProperty("fileDep.alias")
+        else:
+            raise PropertyNotSpecified("fileDep.alias")
+
+        if "filePath" in file_dep_obj:
+            if is_not_blank(file_dep_obj["filePath"]):
+                self.path = file_dep_obj["filePath"]
+            else:
+                raise EmptyProperty("fileDep.filePath")
+        else:
+            raise PropertyNotSpecified("fileDep.filePath")
+
+        if "depDesc" in file_dep_obj:
+            self.desc = file_dep_obj["depDesc"]
+        else:
+            self.desc = ""
+
+    def to_dict(self):
+        return {
+            "depName": self.name,
+            "alias": self.alias,
+            "depDesc": self.desc,
+            "filePath": self.path
+        }
+
+
+class Configuration:
+    __slots__ = ("name", "commands")
+
+    def __init__(self, conf_obj):
+        if "confName" in conf_obj:
+            self.name = conf_obj["confName"]
+        else:
+            self.name = ""
+
+        if "commands" in conf_obj:
+            self.commands = conf_obj["commands"]
+        else:
+            self.commands = []
+
+        if len(self.commands) == 0:
+            raise EmptyProperty("config.commands")
+
+    def to_dict(self):
+        return {
+            "confName": self.name,
+            "commands": list(self.commands)
+        }
+
+
+class InvocationCLI:
+    __slots__ = ("name", "command", "desc")
+
+    def __init__(self, inv_obj):
+        if "invName" in inv_obj:
+            if is_not_blank(inv_obj["invName"]):
+                self.name = inv_obj["invName"]
+            else:
+                raise EmptyProperty("invocation.invName")
+        else:
+            raise PropertyNotSpecified("invocation.invName")
+
+        if "command" in inv_obj:
+            if is_not_blank(inv_obj["command"]):
+                self.command = inv_obj["command"]
+            else:
+                raise EmptyProperty("invocation.command")
+        else:
+            raise PropertyNotSpecified("invocation.command")
+
+        if "invDesc" in inv_obj:
+            self.desc = inv_obj["invDesc"]
+        else:
+            self.desc = ""
+
+    def to_dict(self):
+        return {
+            "invName": self.name,
+            "invDesc": self.desc,
+            "command": self.command
+        }
+
+
+class TestRun:
+    __slots__ = (
+        "name", "transformation_name", "sample_input_params", "sample_input_files", "sample_input_filesets",
+        "sample_output_files", "desc"
+    )
+
+    def __init__(self, testrun_obj):
+        if "name" in testrun_obj:
+            if is_not_blank(testrun_obj["name"]):
+                self.name = testrun_obj["name"]
+            else:
+                raise EmptyProperty("testrun.name")
+        else:
+            raise PropertyNotSpecified("testrun.name")
+
+        if "transformation" in testrun_obj:
+            if is_not_blank(testrun_obj["transformation"]):
+                self.transformation_name = testrun_obj["transformation"]
+            else:
+                raise EmptyProperty("testrun.transformation")
+        else:
+            raise PropertyNotSpecified("testrun.transformation")
+
+        self.sample_input_params = []
+        if "sampleInputParams" in testrun_obj:
+            for sip in testrun_obj["sampleInputParams"]:
+                try:
+                    sample_input_param = SampleInputParameter(sip)
+                    self.sample_input_params.append(sample_input_param)
+                except EmptyProperty as e:
+                    print('EmptyProperty exception: ', e.msg)
+                except PropertyNotSpecified as er:
+                    print('PropertyNotSpecified exception: ', er.msg)
+
+        self.sample_input_files = []
+        if "sampleInputFiles" in testrun_obj:
+            for sif in testrun_obj["sampleInputFiles"]:
+                try:
+                    sample_input_file = SampleInputFile(sif)
+                    self.sample_input_files.append(sample_input_file)
+                except EmptyProperty as e:
+                    print('EmptyProperty exception: ', e.msg)
+                except PropertyNotSpecified as er:
+                    print('PropertyNotSpecified exception: ', er.msg)
+
+        self.sample_input_filesets = []
+        if "sampleInputFileSets" in testrun_obj:
+            for sample_ifs in testrun_obj["sampleInputFileSets"]:
+                try:
+                    sample_input_fileset = SampleInputFileSet(sample_ifs)
+                    self.sample_input_filesets.append(sample_input_fileset)
+                except EmptyProperty as e:
+                    print('EmptyProperty exception: ', e.msg)
+                except PropertyNotSpecified as er:
+                    print('PropertyNotSpecified exception: ', er.msg)
+
+        if len(self.sample_input_params) + len(self.sample_input_files) + len(self.sample_input_filesets) == 0:
+            raise EmptyProperty("testrun.inputs")
+
+        self.sample_output_files = []
+        if "resultingOutputFiles" in testrun_obj:
+            for sample_of in testrun_obj["resultingOutputFiles"]:
+                try:
+                    sample_output_file = SampleOutputFile(sample_of)
+                    self.sample_output_files.append(sample_output_file)
+                except EmptyProperty as e:
+                    print('EmptyProperty exception: ', e.msg)
+                except PropertyNotSpecified as er:
+                    print('PropertyNotSpecified exception: ', er.msg)
+
+        if len(self.sample_output_files) == 0:
+            raise EmptyProperty("testrun.outputs")
+
+        if "description" in testrun_obj:
+            self.desc = testrun_obj["description"]
+        else:
+            self.desc = ""
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "description": self.desc,
+            "transformation": self.transformation_name,
+            "sampleInputParams": [p.to_dict() for p in self.sample_input_params],
+            "sampleInputFiles": [f.to_dict() for f in self.sample_input_files],
+            "sampleInputFileSets": [fs.to_dict() for fs in self.sample_input_filesets],
+            "resultingOutputFiles": [o.to_dict() for o in self.sample_output_files]
+        }
+
+
+class SampleInputParameter:
+    __slots__ = ("alias", "value")
+
+    def __init__(self, param):
+        if "alias" in param:
+            if is_not_blank(param["alias"]):
+                self.alias = param["alias"]
+            else:
+                raise EmptyProperty("sampleInputParam.alias")
+        else:
+            raise PropertyNotSpecified("sampleInputParam.alias")
+
+        if "value" in param:
+            if is_not_blank(param["value"]):
+                self.value = param["value"]
+            else:
+                raise EmptyProperty("sampleInputParam.value")
+        else:
+            raise PropertyNotSpecified("sampleInputParam.value")
+
+    def to_dict(self):
+        return {
+            "alias": self.alias,
+            "value": self.value
+        }
+
+
+class SampleInputFile:
+    __slots__ = ("alias", "access_path")
+
+    def __init__(self, file):
+        if "alias" in file:
+            if is_not_blank(file["alias"]):
+                self.alias = file["alias"]
+            else:
+                raise EmptyProperty("sampleInputFile.alias")
+        else:
+            raise PropertyNotSpecified("sampleInputFile.alias")
+
+        if "accessPath" in file:
+            if is_not_blank(file["accessPath"]):
+                self.access_path = file["accessPath"]
+            else:
+                raise EmptyProperty("sampleInputFile.accessPath")
+        else:
+            raise PropertyNotSpecified("sampleInputFile.accessPath")
+
+    def to_dict(self):
+        return {
+            "alias": self.alias,
+            "accessPath": self.access_path
+        }
+
+
+class SampleInputFileSet:
+    __slots__ = ("alias", "access_path")
+
+    def __init__(self, fileset):
+        if "alias" in fileset:
+            if is_not_blank(fileset["alias"]):
+                self.alias = fileset["alias"]
+            else:
+                raise EmptyProperty("sampleInputFileSet.alias")
+        else:
+            raise PropertyNotSpecified("sampleInputFileSet.alias")
+
+        if "accessPath" in fileset:
+            if is_not_blank(fileset["accessPath"]):
+                self.access_path = fileset["accessPath"]
+            else:
+                raise EmptyProperty("sampleInputFileSet.accessPath")
+        else:
+            raise PropertyNotSpecified("sampleInputFileSet.accessPath")
+
+    def to_dict(self):
+        return {
+            "alias": self.alias,
+            "accessPath": self.access_path
+        }
+
+
+class SampleOutputFile:
+    __slots__ = ("alias", "output_path")
+
+    def __init__(self, file):
+        if "alias" in file:
+            if is_not_blank(file["alias"]):
+                self.alias = file["alias"]
+            else:
+                raise EmptyProperty("sampleOutputFile.alias")
+        else:
+            raise PropertyNotSpecified("sampleOutputFile.alias")
+
+        if "outputPath" in file:
+            if is_not_blank(file["outputPath"]):
+                self.output_path = file["outputPath"]
+            else:
+                raise EmptyProperty("sampleOutputFile.outputPath")
+        else:
+            raise PropertyNotSpecified("sampleOutputFile.outputPath")
+
+    def to_dict(self):
+        return {
+            "alias": self.alias,
+            "outputPath": self.output_path
+        }
+
+
+class Error(Exception):
+    # Error is derived class for Exception, but
+    # Base class for exceptions in this module
+    pass
+
+
+class EmptyProperty(Error):
+    """Raised when the property is not provided in the package specification"""
+    def __init__(self, prop):
+        self.prop_name = prop
+        # Error message thrown is saved in msg
+        self.msg = "Error when creating property " + prop + ", the value cannot be empty"
+
+
+class PropertyNotSpecified(Error):
+    """Raised when the property is not provided in the package specification"""
+    def __init__(self, prop):
+        self.prop_name = prop
+        # Error message thrown is saved in msg
+        self.msg = "Property " + prop + " is missing"
+
+
+def dict_to_app_pkg_spec_object(json_dict) -> ApplicationSpecification:
+    try:
+        desc_entity = None
+        if "appInfo" in json_dict:
+            desc_entity = Description(json_dict["appInfo"])
+
+        transformations = []
+        if "transformations" in json_dict:
+            for t in json_dict["transformations"]:
+                transformation = Transformation(t)
+                transformations.append(transformation)
+        dep_spec = None
+        if "dependencies" in json_dict:
+            dep_spec = DependencySpec(json_dict["dependencies"])
+
+        configurations = []
+        if "configs" in json_dict:
+            for c in json_dict["configs"]:
+                config = Configuration(c)
+                configurations.append(config)
+
+        invocations = []
+        if "invocations" in json_dict and "invocationsCLI" in json_dict["invocations"]:
+            for i in json_dict["invocations"]["invocationsCLI"]:
+                invocation = InvocationCLI(i)
+                invocations.append(invocation)
+
+        testruns = []
+        if "testRuns" in json_dict:
+            for tr in json_dict["testRuns"]:
+                testrun = TestRun(tr)
+                testruns.append(testrun)
+
+        result = ApplicationSpecification(
+            desc_entity,
+            transformations,
+            dep_spec,
+            configurations,
+            invocations,
+            testruns
+        )
+
+        return result
+
+    except EmptyProperty as e:
+        print('EmptyProperty exception:', e.msg)
+    except PropertyNotSpecified as er:
+        print('PropertyNotSpecified exception:', er.msg)
+    except Exception:
+        print(traceback.format_exc())
+
+
+def is_not_blank(str_arg):
+    return bool(str_arg and str_arg.strip())
+
+
+class ApplicationSpecJsonEncoder(json.JSONEncoder):
+    # kept for callers passing cls=ApplicationSpecJsonEncoder, every model
+    # converts itself (and its children) in a single to_dict() call
+    def default(self, o):
+        to_dict = getattr(o, "to_dict", None)
+        if to_dict is not None:
+            return to_dict()
+
+        raise TypeError("Type not serializable")
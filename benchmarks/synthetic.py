@@ -0,0 +1,62 @@
+# Synthetic app-spec.json documents for the benchmarks in this folder
+
+FORMATS = ["csv", "xml", "json", "txt", "png", "pdf", "vtk", "zip"]
+
+
+def make_transformation(i):
+    return {
+        "name": "transformation" + str(i),
+        "qname": "{http://example.org/hdtapps}transformation" + str(i),
+        "inputParams": [
+            {"inputName": "param" + str(p), "alias": "$param" + str(p), "type": "string" if p % 2 else "integer",
+             "isOptional": p > 1, "value": ""} for p in range(4)
+        ],
+        "inputFiles": [
+            {"inputName": "file" + str(f), "alias": "$file" + str(f), "format": FORMATS[(i + f) % len(FORMATS)],
+             "isOptional": False, "schema": "", "requiredPath": "{r}/input/"} for f in range(2)
+        ],
+        "inputFileSets": [
+            {"inputName": "fileset", "alias": "$fileset", "format": FORMATS[i % len(FORMATS)],
+             "isOptional": True, "requiredPath": "{r}/filesets/", "fileSetSize": 10}
+        ],
+        "outputFiles": [
+            {"outputName": "result", "alias": "$result", "format": FORMATS[(i + 3) % len(FORMATS)],
+             "accessPath": "{r}/output/"}
+        ]
+    }
+
+
+def make_test_run(i):
+    return {
+        "name": "testrun" + str(i),
+        "transformation": "transformation" + str(i),
+        "description": "synthetic test run",
+        "sampleInputParams": [{"alias": "$param" + str(p), "value": str(p)} for p in range(4)],
+        "sampleInputFiles": [{"alias": "$file" + str(f), "accessPath": "testruns/input" + str(f)} for f in range(2)],
+        "sampleInputFileSets": [{"alias": "$fileset", "accessPath": "testruns/fileset"}],
+        "resultingOutputFiles": [{"alias": "$result", "outputPath": "testruns/result"}]
+    }
+
+
+def make_spec(transformations=100, test_runs=100, app_index=0):
+    return {
+        "appInfo": {
+            "appName": "syntheticApp" + str(app_index),
+            "appDevelopers": ["Jane Doe", "John Roe"],
+            "appPublisher": "Benchmark Publisher",
+            "appVersion": "1.0",
+            "appDesc": "synthetic application",
+            "appLicense": "Apache 2.0",
+            "tags": ["synthetic", "benchmark"]
+        },
+        "transformations": [make_transformation(i) for i in range(transformations)],
+        "dependencies": {
+            "envDeps": [{"depName": "VAR" + str(e), "alias": "$var" + str(e), "value": str(e)} for e in range(5)],
+            "softDeps": [{"depName": "dep" + str(d), "alias": "$dep" + str(d),
+                          "commands": ["apt-get update", "apt-get install -y dep" + str(d)]} for d in range(5)],
+            "fileDeps": [{"depName": "file", "alias": "$filedep", "filePath": "dep/file"}]
+        },
+        "configs": [{"confName": "default", "commands": ["configure"]}],
+        "invocations": {"invocationsCLI": [{"invName": "run", "command": "run.sh $param0 $file0"}]},
+        "testRuns": [make_test_run(i) for i in range(test_runs)]
+    }
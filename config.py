@@ -8,11 +8,92 @@ class Config:
     DB_NAME = 'hdtapps'
     APP_COLL_NAME = 'applications'
     TRANSF_COLL_NAME = 'transformations'
+    META_COLL_NAME = 'meta'
+    PUBLISH_JOBS_COLL_NAME = 'publish_jobs'
+    BASE_IMAGES_COLL_NAME = 'base_images'
+    BUILDS_COLL_NAME = 'image_builds'
+    DB_MAX_POOL_SIZE = 100
+    DB_MIN_POOL_SIZE = 0
+    DB_MAX_IDLE_TIME_MS = None
+    DB_CONNECT_TIMEOUT_MS = 20000
+    DB_SOCKET_TIMEOUT_MS = None
+    DB_SERVER_SELECTION_TIMEOUT_MS = 30000
+    DB_WAIT_QUEUE_TIMEOUT_MS = None
+    DB_ENSURE_INDEXES = True
     DOCKER_IMAGES_TAG_PREFIX = 'hdtapps/'
+    # the Docker API client is shared by all calls of a process
+    DOCKER_TIMEOUT = 60
+    DOCKER_NUM_POOLS = 25
+    DOCKER_API_VERSION = None
+    # an idle client is pinged before it is used again
+    DOCKER_HEALTH_CHECK_INTERVAL = 30
+    DOCKER_BASE_IMAGE = 'ubuntu:14.04'
+    # build with BuildKit (docker CLI) to keep apt/pip caches between builds
+    DOCKER_BUILDKIT = False
+    # apps with the same software dependencies are built FROM one shared base image
+    DOCKER_SHARED_BASE_IMAGES = True
+
+    # limits of downloaded application archives and input filesets
+    ARCHIVE_MAX_SIZE = 2 * 1024 ** 3
+    ARCHIVE_MAX_EXTRACTED_SIZE = 8 * 1024 ** 3
+    ARCHIVE_MAX_FILES = 100000
+    ARCHIVE_CHUNK_SIZE = 1024 ** 2
+    # zip archives are spooled in memory up to this size before going to disk
+    ARCHIVE_SPOOL_SIZE = 64 * 1024 ** 2
+    # connect/read timeout in seconds of application archive downloads
+    ARCHIVE_DOWNLOAD_TIMEOUT = 60
+    # threads hashing/copying the files of a published application
+    FILE_TRANSFER_WORKERS = 8
+    # documents per NDJSON entry of an exported catalogue, also the import batch size
+    CATALOGUE_BATCH_SIZE = 1000
 
     CELERY_BROKER_URL = 'redis://localhost:6379/0'
     CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
     CELERY_TRACK_STARTED = True
+    # the build stage of the publish pipeline runs on its own queue, the number of
+    # concurrent builds is the concurrency of the worker(s) consuming it
+    PUBLISH_BUILD_QUEUE = 'builds'
+    # with the Redis broker 0 is the highest priority, publish requests may set 0-9
+    PUBLISH_DEFAULT_PRIORITY = 5
+    BROKER_TRANSPORT_OPTIONS = {'priority_steps': list(range(10)), 'queue_order_strategy': 'priority'}
+    # workers reserve one task at a time, otherwise queued builds are held back by
+    # a busy worker instead of going to the next free one in priority order
+    CELERYD_PREFETCH_MULTIPLIER = 1
+    # a build running longer is stopped, also the read timeout of the Docker API
+    DOCKER_BUILD_TIMEOUT = 3600
+    # only the last lines of a build's output are kept in its status document
+    DOCKER_BUILD_LOG_LINES = 1000
+    # run transformations by exec in pre-started containers kept per image and worker
+    # process, the app folder is restored before every run
+    WARM_POOL_ENABLED = False
+    # per worker process, a worker with --concurrency N keeps up to N times as many
+    WARM_POOL_MAX_PER_IMAGE = 2
+    # seconds an idle container is kept
+    WARM_POOL_IDLE_TIMEOUT = 600
+    # 'copy' streams the inputs of a task into its container, 'mount' bind-mounts
+    # their folders under data/tasks/<task_id> read-only at the required paths
+    TASK_INPUTS_MODE = 'copy'
+    # data/tasks as seen by the Docker host if it differs, e.g. for a containerized worker
+    TASKS_HOST_DIR = None
+    # post every output file to the resultsEndpoint of its task while it is extracted
+    TASK_FORWARD_OUTPUTS = False
+    # input files and filesets of a task are downloaded concurrently by this many
+    # threads, at most INPUT_DOWNLOAD_PER_HOST at a time from the same host
+    INPUT_DOWNLOAD_WORKERS = 8
+    INPUT_DOWNLOAD_PER_HOST = 4
+    # connect/read timeout in seconds, failed downloads are retried after 1, 2, 4... seconds
+    INPUT_DOWNLOAD_TIMEOUT = 60
+    INPUT_DOWNLOAD_RETRIES = 3
+    INPUT_DOWNLOAD_BACKOFF = 1
+
+    CACHE_ENABLED = True
+    CACHE_MAX_ENTRIES = 1024
+    CACHE_TTL = 300
+    # the Redis tier keeps the in-process caches of the API and the workers
+    # coherent, set to None to disable caching
+    CACHE_REDIS_URL = CELERY_BROKER_URL
+    CACHE_REDIS_TTL = 3600
+    CACHE_REDIS_PREFIX = 'hdtapps:cache:'
 
 
     @staticmethod
@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import unittest
+import uuid
+from app.mod_repo import cache
+
+# The API and the Celery workers are separate processes with their own
+# in-process cache tier: a write in one of them must be seen by the others.
+
+
+class SharedRemote:
+    # stands in for RedisCache, backed by dicts of a multiprocessing manager
+    def __init__(self, versions, entries, lock):
+        self.versions = versions
+        self.entries = entries
+        self.lock = lock
+
+    def fetch(self, key):
+        with self.lock:
+            return self.versions.get(key, 0), self.entries.get(key)
+
+    def store(self, key, version, value):
+        with self.lock:
+            self.entries[key] = (version, value)
+
+    def invalidate(self, keys):
+        with self.lock:
+            for key in keys:
+                self.versions[key] = self.versions.get(key, 0) + 1
+                self.entries.pop(key, None)
+
+
+def use(remote):
+    cache._local = cache.LRUCache(100, 300)
+    cache._remote = remote
+
+
+def reader(remote, db, requests, results):
+    use(remote)
+    for _ in iter(requests.get, None):
+        results.put(cache.get_or_load("app:a", lambda: dict(db)))
+
+
+class CrossProcessInvalidationTest(unittest.TestCase):
+    def run_scenario(self, remote):
+        db = self.manager.dict({"version": 1})
+        requests = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=reader, args=(remote, db, requests, results))
+        process.start()
+        try:
+            requests.put(True)
+            self.assertEqual(results.get(timeout=10), {"version": 1})
+
+            # the write happens in this process, the reader keeps its cached copy
+            use(remote)
+            db["version"] = 2
+            cache.invalidate(["app:a"])
+
+            requests.put(True)
+            self.assertEqual(results.get(timeout=10), {"version": 2})
+        finally:
+            requests.put(None)
+            process.join(10)
+
+    def setUp(self):
+        self.manager = multiprocessing.Manager()
+
+    def tearDown(self):
+        cache._local = None
+        cache._remote = None
+        self.manager.shutdown()
+
+    def test_write_in_one_process_is_read_in_another(self):
+        self.run_scenario(SharedRemote(self.manager.dict(), self.manager.dict(), self.manager.Lock()))
+
+    def test_write_in_one_process_is_read_in_another_with_redis(self):
+        url = os.environ.get("CACHE_TEST_REDIS_URL")
+        if not url:
+            self.skipTest("CACHE_TEST_REDIS_URL is not set")
+        self.run_scenario(cache.RedisCache(url, 60, "hdtapps:test:" + uuid.uuid4().hex + ":"))
+
+
+if __name__ == '__main__':
+    unittest.main()